@@ -0,0 +1,45 @@
+"""Cost of reading tdl attributes and of tdl.is_initialized.
+
+    python benchmarks/access_bench.py [-n 1000000]
+"""
+import argparse
+import timeit
+
+import tdl_attrs as tdl
+
+
+@tdl.define
+class Dense(object):
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def bias(self, value=0.0):
+        return [value]*self.units
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=1000000)
+    args = parser.parse_args()
+    built = Dense()
+    tdl.build(built, units=4)
+    empty = Dense()
+    cases = [
+        ("read initialized", lambda: built.weights),
+        ("read uninitialized", lambda: empty.weights),
+        ("is_initialized (True)",
+         lambda: tdl.is_initialized(built, "weights")),
+        ("is_initialized (False)",
+         lambda: tdl.is_initialized(empty, "weights")),
+        ]
+    for name, fn in cases:
+        time = timeit.timeit(fn, number=args.number)
+        print(f"{name:>24}: {1e9*time/args.number:.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
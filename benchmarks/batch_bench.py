@@ -0,0 +1,73 @@
+"""Construction of many instances with a loop over the constructor vs
+tdl.construct_many, with and without a batch initializer.
+
+    python benchmarks/batch_bench.py [-n 10000] [-r 5]
+
+Times are the best of -r repeats, with the garbage collector disabled.
+"""
+import argparse
+import gc
+import time
+
+import tdl_attrs as tdl
+
+
+def make_model(batched):
+    class Dense(object):
+        units = tdl.pr.required()
+        activation = tdl.pr.optional("relu")
+
+        @tdl.pr(reqs=[units])
+        def weights(self, value=1.0):
+            return [value]*self.units
+
+        @tdl.pr(reqs=[units])
+        def bias(self, value=0.0):
+            return [value]*self.units
+
+    if batched:
+        def fbatch(objs, calls):
+            return [[kargs.get("value", 1.0)]*obj.units
+                    for obj, (_, kargs) in zip(objs, calls)]
+        Dense.weights = Dense.weights.batch(fbatch)
+        Dense.bias = Dense.bias.batch(
+            lambda objs, calls: [[0.0]*obj.units for obj in objs])
+    return tdl.define(Dense)
+
+
+def timed(fn, repeat):
+    # as timeit, the garbage collector is disabled while timing
+    times = list()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=10000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    configs = [{"units": 1 + i % 16, "weights": {"value": 0.5}}
+               for i in range(args.number)]
+    model = make_model(batched=False)
+    loop = timed(lambda: [model(**ci) for ci in configs], args.repeat)
+    many = timed(lambda: tdl.construct_many(model, configs), args.repeat)
+    batched = make_model(batched=True)
+    many_batched = timed(lambda: tdl.construct_many(batched, configs),
+                         args.repeat)
+    for name, value in [("constructor loop", loop),
+                        ("construct_many", many),
+                        ("construct_many (batch finits)", many_batched)]:
+        print(f"{name:>30}: {1e6*value/args.number:.2f} us/instance "
+              f"({loop/value:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
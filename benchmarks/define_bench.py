@@ -0,0 +1,106 @@
+"""Cost of tdl.define on a large synthetic hierarchy of classes (a model
+zoo), compared with walking the whole MRO of each class to build its graph
+(the path used before graphs were extended incrementally).
+
+Each class derives from the class `index // branching` and adds `attrs`
+descriptors that require the descriptors of its parent. The hierarchy is
+also written as a module and imported in a fresh interpreter.
+
+    python benchmarks/define_bench.py [--classes 300] [--attrs 8]
+                                      [--branching 2] [-n 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tdl_attrs import core
+from tdl_attrs.graph import DiGraph
+
+
+def make_source(n_classes, n_attrs, branching):
+    lines = ["import tdl_attrs as tdl", ""]
+    for ci in range(n_classes):
+        parent = None if ci == 0 else (ci - 1) // branching
+        base = "object" if parent is None else f"Model{parent}"
+        lines += ["", "@tdl.define", f"class Model{ci}({base}):"]
+        for ai in range(n_attrs):
+            reqs = "" if parent is None else \
+                f"(reqs=[Model{parent}.attr_{parent}_{ai}])"
+            lines += [f"    @tdl.pr{reqs}",
+                      f"    def attr_{ci}_{ai}(self, value={ai}):",
+                      "        return value", ""]
+    return "\n".join(lines) + "\n"
+
+
+def full_extend_graph(cls):
+    """Graph of cls built from its whole MRO, reading the docstrings of the
+    descriptors as they were built eagerly."""
+    graph = DiGraph()
+    for ci in cls.__mro__[::-1]:
+        for ni, desc_i in ci.__dict__.items():
+            if isinstance(desc_i, core.TdlDescriptor):
+                desc_i.__doc__
+                graph.add_node(ni, desc=desc_i)
+    for ni in graph.nodes:
+        for nj in graph.nodes[ni]['desc'].reqs:
+            graph.add_edge(nj.name, ni)
+    graph.find_cycle()
+    return graph, None, ()
+
+
+def time_define(source, number):
+    code = compile(source, "zoo", "exec")
+    times = list()
+    for _ in range(number):
+        start = time.perf_counter()
+        exec(code, dict())
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def time_import(directory, module, number):
+    times = list()
+    for _ in range(number):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"],
+                       check=True, cwd=directory,
+                       env={**os.environ, "PYTHONPATH": os.pathsep.join(
+                           [directory] + sys.path)})
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--classes", type=int, default=300)
+    parser.add_argument("--attrs", type=int, default=8)
+    parser.add_argument("--branching", type=int, default=2)
+    parser.add_argument("-n", "--number", type=int, default=5)
+    args = parser.parse_args()
+    source = make_source(args.classes, args.attrs, args.branching)
+    incremental = time_define(source, args.number)
+    extend_graph = core._extend_graph
+    core._extend_graph = full_extend_graph
+    try:
+        full = time_define(source, args.number)
+    finally:
+        core._extend_graph = extend_graph
+    print(f"classes: {args.classes}, descriptors: "
+          f"{args.classes*args.attrs}, branching: {args.branching}")
+    print(f"define (full MRO walk):    {1e3*full:.1f} ms")
+    print(f"define (incremental):      {1e3*incremental:.1f} ms")
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "tdl_zoo.py"), "w") as file:
+            file.write(source)
+        zoo = time_import(directory, "tdl_zoo", args.number)
+        base = time_import(directory, "tdl_attrs", args.number)
+    print(f"import of the zoo module:  {1e3*(zoo - base):.1f} ms "
+          "(import tdl_attrs subtracted)")
+
+
+if __name__ == "__main__":
+    main()
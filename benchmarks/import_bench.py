@@ -0,0 +1,37 @@
+"""Wall time and loaded modules of `import tdl_attrs` in a fresh interpreter.
+
+    python benchmarks/import_bench.py [-n 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SNIPPET = "import sys, tdl_attrs; print(len(sys.modules), 'networkx' in sys.modules)"
+
+
+def time_import(snippet, number):
+    times = list()
+    for _ in range(number):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", snippet], check=True,
+                                capture_output=True, text=True).stdout
+        times.append(time.perf_counter() - start)
+    return times, output.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=20)
+    args = parser.parse_args()
+    baseline, _ = time_import("pass", args.number)
+    times, (n_modules, networkx) = time_import(SNIPPET, args.number)
+    overhead = statistics.median(times) - statistics.median(baseline)
+    print(f"import tdl_attrs: {1e3*overhead:.2f} ms (median over "
+          f"{args.number} runs, interpreter start-up subtracted)")
+    print(f"modules loaded: {n_modules}, networkx imported: {networkx}")
+
+
+if __name__ == "__main__":
+    main()
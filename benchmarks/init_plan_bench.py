@@ -0,0 +1,72 @@
+"""Construction cost of the cached init plans vs a per-instance topological
+sort of the class graph (the path used before plans were cached), and of
+the unchecked plans of classes defined with strict=True.
+
+    python benchmarks/init_plan_bench.py [--width 8] [--depth 4] [-n 20000]
+"""
+import argparse
+import timeit
+
+import tdl_attrs as tdl
+from tdl_attrs import core
+
+
+def make_model(width, depth, **options):
+    """Class with `depth` layers of `width` INIT attributes, each layer
+    requiring every attribute of the previous one."""
+    body = dict()
+    prev = list()
+    for di in range(depth):
+        layer = list()
+        for wi in range(width):
+            desc = tdl.pr(reqs=list(prev))(lambda self, value=1: value)
+            desc.update_name(f"attr_{di}_{wi}")
+            body[desc.name] = desc
+            layer.append(desc)
+        prev = layer
+    return tdl.define(type("Model", (object,), body), **options)
+
+
+def sorted_init_graph(cls, obj, _tdl_order=tdl.INIT, **kargs):
+    graph = cls.__TDL__.graph
+    for ni in graph.topological_sort():
+        desc = graph.nodes[ni]['desc']
+        if desc.order != _tdl_order:
+            continue
+        if core.is_initialized(obj, ni):
+            continue
+        assert all([core.is_initialized(obj, ri.name) for ri in desc.reqs])
+        core.initialize_attr(obj, ni, kargs)
+
+
+def run(width, depth, number):
+    model = make_model(width, depth)
+    plan_time = timeit.timeit(model, number=number)
+    init_graph = core.init_graph
+    core.init_graph = sorted_init_graph
+    try:
+        sorted_time = timeit.timeit(model, number=number)
+    finally:
+        core.init_graph = init_graph
+    strict_time = timeit.timeit(
+        make_model(width, depth, strict=True), number=number)
+    return plan_time, sorted_time, strict_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    args = parser.parse_args()
+    plan_time, sorted_time, strict_time = run(
+        args.width, args.depth, args.number)
+    print(f"nodes: {args.width*args.depth}, instances: {args.number}")
+    print(f"topological sort: {1e6*sorted_time/args.number:.2f} us/instance")
+    print(f"cached plan:      {1e6*plan_time/args.number:.2f} us/instance")
+    print(f"speedup:          {sorted_time/plan_time:.2f}x")
+    print(f"strict plan:      {1e6*strict_time/args.number:.2f} us/instance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Bytes per instance of a small tdl class with and without slots=True, and
+per row of a tdl.Collection. Also bytes per instance constructed with a
+large argument (--arg-bytes) for each retention policy of the arguments.
+
+    python benchmarks/memory_bench.py [--attrs 4] [-n 100000]
+                                      [--arg-bytes 4096]
+"""
+import argparse
+import gc
+import tracemalloc
+
+import tdl_attrs as tdl
+
+
+def make_model(n_attrs, **options):
+    body = {f"attr_{i}": tdl.pr.optional(float(i)) for i in range(n_attrs)}
+    body["__slots__"] = ()
+    if not options.get("slots"):
+        del body["__slots__"]
+    return tdl.define(type("Model", (object,), body), **options)
+
+
+def make_sized_model(n_attrs, retain):
+    """Model whose first attribute only stores the size of its argument."""
+    body = {f"attr_{i}": tdl.pr.optional(float(i)) for i in range(n_attrs)}
+    body["attr_0"] = tdl.pr(lambda self, value=b"": len(value))
+    body["attr_0"].update_name("attr_0")
+    return tdl.define(type("Model", (object,), body), retain=retain)
+
+
+def bytes_per_instance(model, number, collection=False, arg_bytes=None):
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    if collection:
+        objs = tdl.Collection(model, number)
+    elif arg_bytes:
+        objs = [model(attr_0=bytes(arg_bytes)) for _ in range(number)]
+    else:
+        objs = [model() for _ in range(number)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(objs) == number
+    return (current - start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attrs", type=int, default=4)
+    parser.add_argument("-n", "--number", type=int, default=100000)
+    parser.add_argument("--arg-bytes", type=int, default=4096)
+    args = parser.parse_args()
+    print(f"attributes: {args.attrs}, instances: {args.number}")
+    for name, options in [("__dict__", dict()),
+                          ("slots=True", dict(slots=True))]:
+        size = bytes_per_instance(make_model(args.attrs, **options),
+                                  args.number)
+        print(f"{name:>10}: {size:.0f} bytes/instance")
+    size = bytes_per_instance(make_model(args.attrs), args.number,
+                              collection=True)
+    print(f"{'Collection':>10}: {size:.0f} bytes/row")
+    number = max(1, args.number // 10)
+    for retain in (None, "summary", "weak", "drop"):
+        model = make_sized_model(args.attrs, retain)
+        size = bytes_per_instance(model, number, arg_bytes=args.arg_bytes)
+        print(f"retain={retain or 'all'}: {size:.0f} bytes/instance with "
+              f"a {args.arg_bytes} bytes argument")
+
+
+if __name__ == "__main__":
+    main()
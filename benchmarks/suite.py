@@ -0,0 +1,179 @@
+"""Benchmark suite of the hot paths of tdl: define, construction, build,
+get_input_args and attribute access.
+
+The classes are synthetic: `depth` layers of `width` INIT attributes, each
+layer requiring every attribute of the previous one, plus a layer of BUILD
+attributes. The layers are split over `inherit` levels of subclasses and,
+with --diamond, the last level is a diamond (Leaf(Left, Right), both
+subclasses of the same base, like ModelD in tests/core_test.py).
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+
+Results are times per call in microseconds (best of --repeat). With
+--baseline, the cases slower than the baseline by more than --tolerance are
+reported and the exit status is 1. Baselines are only comparable on the
+same machine and python version.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import tdl_attrs as tdl
+
+# (width, depth, inherit, diamond)
+CONFIGS = [
+    (4, 2, 1, False),
+    (8, 4, 1, False),
+    (4, 4, 4, False),
+    (4, 4, 2, True),
+    ]
+
+ARG_STYLES = {
+    "plain": lambda value: value,
+    "dict": lambda value: {"value": value},
+    "ar": lambda value: tdl.ar(value=value),
+    }
+
+
+def _finit(self, value=1):
+    return value
+
+
+def _layer(body, name, width, reqs, order=tdl.INIT):
+    layer = list()
+    for wi in range(width):
+        desc = tdl.pr(reqs=list(reqs), order=order)(_finit)
+        desc.update_name(f"{name}_{wi}")
+        body[desc.name] = desc
+        layer.append(desc)
+    return layer
+
+
+def make_hierarchy(width, depth, inherit=1, diamond=False):
+    """Define the synthetic classes and return the leaf class and the names
+    of its INIT attributes."""
+    levels = [list() for _ in range(inherit)]
+    for di in range(depth):
+        levels[di*inherit // depth].append(di)
+    names = list()
+    prev = list()
+    cls = object
+    for li, layers in enumerate(levels):
+        bases = (cls,)
+        if diamond and li == inherit - 1:
+            left = dict()
+            left_layer = _layer(left, "left", width, prev)
+            right = dict()
+            right_layer = _layer(right, "right", width, prev)
+            bases = (tdl.define(type("Left", (cls,), left)),
+                     tdl.define(type("Right", (cls,), right)))
+            names += [desc.name for desc in left_layer + right_layer]
+            prev = left_layer + right_layer
+        body = dict()
+        for di in layers:
+            prev = _layer(body, f"attr_{di}", width, prev)
+            names += [desc.name for desc in prev]
+        if li == inherit - 1:
+            _layer(body, "built", width, prev, order=tdl.BUILD)
+        cls = tdl.define(type(f"Level{li}", bases, body))
+    return cls, names
+
+
+def timed(fn, number, repeat):
+    """Best time per call of fn() in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start)/number)
+    return 1e6*best
+
+
+def timed_each(make, fn, number, repeat):
+    """Best time per call of fn(obj) for objects created with make()."""
+    best = float("inf")
+    for _ in range(repeat):
+        objs = [make() for _ in range(number)]
+        start = time.perf_counter()
+        for obj in objs:
+            fn(obj)
+        best = min(best, (time.perf_counter() - start)/number)
+    return 1e6*best
+
+
+def run_config(width, depth, inherit, diamond, number, repeat):
+    tag = f"w{width}-d{depth}-i{inherit}" + ("-diamond" if diamond else "")
+    results = dict()
+    results[f"define/{tag}"] = timed(
+        lambda: make_hierarchy(width, depth, inherit, diamond),
+        max(1, number // 100), repeat)
+    model, names = make_hierarchy(width, depth, inherit, diamond)
+    for style, fmt in ARG_STYLES.items():
+        kargs = {ni: fmt(2) for ni in names}
+        results[f"construct/{style}/{tag}"] = timed(
+            lambda: model(**kargs), number, repeat)
+    results[f"build/{tag}"] = timed_each(
+        model, lambda obj: tdl.build(obj, built_0=2), number, repeat)
+    obj = model(**{ni: 2 for ni in names})
+    tdl.build(obj)
+    results[f"get_input_args/{tag}"] = timed(
+        lambda: tdl.get_input_args(obj), number, repeat)
+    name = names[-1]
+    results[f"get/{tag}"] = timed(
+        lambda: getattr(obj, name), 10*number, repeat)
+    results[f"is_initialized/{tag}"] = timed(
+        lambda: tdl.is_initialized(obj, name), 10*number, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Cases slower than baseline by more than tolerance, as tuples
+    (case, baseline time, time)."""
+    return [(case, baseline[case], value)
+            for case, value in results.items()
+            if case in baseline and value > baseline[case]*(1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=2000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--inherit", type=int, default=1)
+    parser.add_argument("--diamond", action="store_true")
+    parser.add_argument("-o", "--output", help="write the results as json")
+    parser.add_argument("--baseline", help="json results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown (default 0.25)")
+    args = parser.parse_args()
+    configs = CONFIGS if args.width is None else \
+        [(args.width, args.depth, args.inherit, args.diamond)]
+    results = dict()
+    for config in configs:
+        results.update(run_config(*config, args.number, args.repeat))
+    for case, value in results.items():
+        print(f"{case:<40} {value:>10.3f} us")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": sys.version.split()[0],
+                       "platform": platform.platform(),
+                       "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        slower = compare(results, baseline, args.tolerance)
+        for case, before, after in slower:
+            print(f"regression {case}: {before:.3f} -> {after:.3f} us "
+                  f"({after/before:.2f}x)")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
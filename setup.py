@@ -8,7 +8,8 @@ import importlib.util
 # for distribution: python setup.py sdist #bdist_wheel
 #                   pip install dist/project_name.tar.gz
 
-DEPS = ['networkx']
+DEPS = []
+DEPS_GRAPH = ['networkx']
 DEPS_DEV = ['pytest', 'coverage']
 
 
@@ -22,6 +23,7 @@ setup(name='tdl_attrs',
           exclude=["*test*", "tests"]),
       install_requires=get_dependencies(),
       extras_require={
+          'graph': DEPS_GRAPH,
           'dev': DEPS_DEV
       },
       licence='MIT',
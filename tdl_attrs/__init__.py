@@ -1,15 +1,54 @@
+import importlib
+
 from .core import (
     is_initialized,
     build,
+    plan,
+    invalidate,
+    rebuild,
     get_input_args,
+    use_executor,
     OrderType,
     TdlArgs,
     TdlDescriptor,
     )
-from .core import define
+from .core import define, DefinitionError
+from .graph import CycleError
+from .batch import construct_many, build_many
+from .cache import InitCache
+from .retention import Retention, ArgSummary, WeakArg
+from .evict import MemoryManager, EvictionInfo
+from . import evict
+from .memory import memory_report, MemoryReport
+from . import memory
+from .costs import CostModel, explain
+from . import costs
+from .snapshot import snapshot, restore, SnapshotCache
+from .instrument import instrument, InitEvent, InitStats, ChromeTrace
 
 pr = TdlDescriptor
 ar = TdlArgs
 INIT = OrderType.INIT
 BUILD = OrderType.BUILD
 MANUAL = OrderType.MANUAL
+LAZY = OrderType.LAZY
+
+
+# names of the modules loaded on first use, so that importing tdl_attrs
+# does not import asyncio, concurrent.futures or numpy
+_LAZY = {
+    'acreate': 'aio',
+    'abuild': 'aio',
+    'parallel_build': 'parallel',
+    'Collection': 'collection',
+    }
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY[name]}", __name__)
+    for ni, mi in _LAZY.items():
+        if mi == _LAZY[name]:
+            globals()[ni] = getattr(module, ni)
+    return globals()[name]
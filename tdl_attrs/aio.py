@@ -0,0 +1,113 @@
+"""asyncio initialization of tdl objects.
+
+Descriptors can use `async def` initializers. They are awaited by
+tdl.acreate (construction) and tdl.abuild (build), which run the nodes of
+the init plan as tasks: each node waits for its requirements, so
+independent nodes are awaited concurrently. Synchronous finits run in the
+event loop thread.
+"""
+import asyncio
+
+from .core import (
+    OrderType, TDLobj, get_call_args, init_user, is_initialized,
+    release_args, resolve_reqs, update_user_args, _caller)
+from .instrument import hooks, atimed_call
+
+
+async def ainit_nodes(nodes, expand=None):
+    """Initialize the nodes of a schedule (see tdl.parallel.run_nodes) as
+    tasks, each one waiting for its deps.
+
+    Raises the exception of the first failing node in schedule order.
+    """
+    tasks = dict()
+    deps = dict()
+
+    async def run(key, obj, desc, user_args):
+        # expand can add deps to the nodes that wait for key
+        waited = set()
+        while deps[key] - waited:
+            keys = deps[key] - waited
+            waited.update(keys)
+            await asyncio.gather(*[tasks[ki] for ki in keys if ki in tasks])
+        resolve_reqs(obj, desc)
+        args, kargs = (get_call_args(user_args[desc.name])
+                       if desc.name in user_args else ((), dict()))
+        if desc.is_async and hooks:
+            value = await atimed_call(
+                desc.finit, obj, desc, _caller.get(), args, kargs)
+        elif desc.is_async:
+            value = await desc.finit(obj, *args, **kargs)
+        else:
+            value = desc.evaluate(obj, *args, **kargs)
+        desc.store(obj, value)
+        if expand is not None:
+            add(*expand(key))
+
+    def add(new_nodes, extra_deps=None):
+        for key, (obj, desc, user_args, node_deps) in new_nodes.items():
+            deps[key] = set(node_deps)
+            if not is_initialized(obj, desc.name):
+                tasks[key] = asyncio.ensure_future(
+                    run(key, obj, desc, user_args))
+        for key, keys in (extra_deps or dict()).items():
+            if key in deps:
+                deps[key].update(keys)
+
+    add(nodes)
+    while not all(task.done() for task in tasks.values()):
+        await asyncio.wait(list(tasks.values()))
+    errors = [task.exception() for task in tasks.values()]
+    for error in errors:
+        if error is not None:
+            raise error
+
+
+async def ainit_graph(obj, plan, user_args):
+    """Initialize the descriptors in plan that are not initialized.
+
+    Raises the exception of the first failing descriptor in plan order.
+    """
+    await ainit_nodes({desc.name: (obj, desc, user_args,
+                                   {ri.name for ri in desc.reqs})
+                       for desc in plan})
+
+
+async def acreate(cls, *args, **kargs):
+    """Construct an instance of cls, awaiting its async INIT initializers.
+    """
+    obj = cls.__new__(cls)
+    obj.__tdl__ = TDLobj()
+    user_args = init_user(obj, cls.__TDL__.init, args, kargs)
+    token = _caller.set('acreate')
+    try:
+        await ainit_graph(obj, cls.__TDL__.plans[OrderType.INIT],
+                          user_args.graph)
+    finally:
+        _caller.reset(token)
+    release_args(obj)
+    return obj
+
+
+async def abuild(obj, **kargs):
+    """Same as tdl.build, awaiting the async BUILD initializers.
+
+    The tree of components of obj is built as in tdl.build (see
+    tdl.nested).
+    """
+    token = _caller.set('abuild')
+    try:
+        if type(obj).__TDL__.components:
+            from .nested import Schedule
+            schedule = Schedule()
+            await ainit_nodes(schedule.start(obj, kargs), schedule.expand)
+            tree = schedule.tree
+        else:
+            user_args = update_user_args(obj, kargs)
+            await ainit_graph(obj, type(obj).__TDL__.plans[OrderType.BUILD],
+                              user_args)
+            tree = [obj]
+    finally:
+        _caller.reset(token)
+    for obj in tree:
+        release_args(obj)
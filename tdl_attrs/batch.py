@@ -0,0 +1,135 @@
+"""Construction and build of many instances of a class at once.
+
+tdl.construct_many(cls, configs) splits the arguments of configs that
+share the same keywords in a single pass, and initializes the attributes
+one at a time for the whole batch, following the init plan of the class.
+Descriptors with a batch initializer (see TdlDescriptor.batch) are
+initialized with a single call per batch:
+
+    @tdl.pr(reqs=[units])
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+    @weights.batch
+    def weights(objs, calls):
+        return [[kargs.get("value", 1.0)]*obj.units
+                for obj, (args, kargs) in zip(objs, calls)]
+
+A batch initializer only saves the calls of the finit: the arguments are
+still split, and the values stored and flagged, per object. It pays off
+when the values of the batch are computed at once (e.g. with a single
+numpy call), and barely changes the time of cheap finits (see
+benchmarks/batch_bench.py).
+
+Batches are initialized in the calling thread, the executors set with
+tdl.use_executor are not used.
+"""
+from .core import (
+    OrderType, TDLobj, TdlArgs, UserArgs, call_as, call_init, get_call_args,
+    make_init_args, release_args, resolve_reqs, update_user_args)
+
+
+def format_configs(graph, configs):
+    """User arguments of each config (a dict with keyword arguments or a
+    tdl.ar with the arguments of the constructor)."""
+    splits = dict()
+    user_args = list()
+    for config in configs:
+        args, kargs = get_call_args(config)
+        keys = tuple(kargs)
+        if keys not in splits:
+            splits[keys] = ([ki for ki in keys if ki in graph],
+                            [ki for ki in keys if ki not in graph])
+        graph_keys, init_keys = splits[keys]
+        user_args.append(UserArgs(
+            init=make_init_args(args, {ki: kargs[ki] for ki in init_keys}),
+            graph={ki: TdlArgs.infer(kargs[ki]) for ki in graph_keys}))
+    return user_args
+
+
+def init_batch(objs, plan, user_args):
+    """Initialize the descriptors in plan for objs, instances of the same
+    class, using the dicts of user arguments of each object."""
+    tdl = type(objs[0]).__TDL__
+    tdl_objs = [obj.__tdl__ for obj in objs]
+    for desc in plan:
+        name = desc.name
+        bit = tdl.bits[name]
+        batch = [i for i, ti in enumerate(tdl_objs) if not ti.state & bit]
+        if not batch:
+            continue
+        if not tdl.strict:
+            mask = tdl.reqs_mask[name]
+            for i in batch:
+                if tdl_objs[i].state & mask != mask:
+                    resolve_reqs(objs[i], desc)
+        if desc.fbatch is not None:
+            calls = [get_call_args(user_args[i][name])
+                     if name in user_args[i] else ((), dict())
+                     for i in batch]
+            values = desc.fbatch([objs[i] for i in batch], calls)
+        else:
+            evaluate = desc.evaluate
+            values = list()
+            for i in batch:
+                if name in user_args[i]:
+                    args, kargs = get_call_args(user_args[i][name])
+                    values.append(evaluate(objs[i], *args, **kargs))
+                else:
+                    values.append(evaluate(objs[i]))
+        private_name = desc.private_name
+        for i, value in zip(batch, values):
+            setattr(objs[i], private_name, value)
+            tdl_objs[i].state |= bit
+        if desc.evictable is not None:
+            for i, value in zip(batch, values):
+                desc.evictable.add(objs[i], desc, value)
+
+
+def construct_many(cls, configs):
+    """List with an instance of cls for each config, a dict with the
+    keyword arguments of the constructor or a tdl.ar with its arguments.
+
+    Equivalent to [cls(**config) for config in configs].
+    """
+    user_args = format_configs(cls.__TDL__.graph, configs)
+    objs = list()
+    for ui in user_args:
+        obj = cls.__new__(cls)
+        obj.__tdl__ = TDLobj()
+        call_init(obj, cls.__TDL__.init, ui)
+        objs.append(obj)
+    if objs:
+        init_batch(objs, cls.__TDL__.plans[OrderType.INIT],
+                   [ui.graph for ui in user_args])
+    if cls.__TDL__.retain is not None:
+        for obj in objs:
+            release_args(obj)
+    return objs
+
+
+def build_many(objs, **kargs):
+    """Same as calling tdl.build(obj, **kargs) for each object in objs.
+
+    The objects of classes with components are built one at a time, with
+    their tree of components (see tdl.nested).
+    """
+    shared = {ki: TdlArgs.infer(vi) for ki, vi in kargs.items()}
+    groups = dict()
+    for obj in objs:
+        groups.setdefault(type(obj), list()).append(obj)
+    for cls, group in groups.items():
+        if cls.__TDL__.components:
+            from .nested import build_tree
+            for obj in group:
+                call_as('build', build_tree, obj, kargs)
+            continue
+        # each object receives its own copy of the shared arguments
+        user_args = [
+            update_user_args(obj, {ki: TdlArgs(*vi.args, **vi.kargs)
+                                   for ki, vi in shared.items()})
+            for obj in group]
+        init_batch(group, cls.__TDL__.plans[OrderType.BUILD], user_args)
+        if cls.__TDL__.retain is not None:
+            for obj in group:
+                release_args(obj)
@@ -0,0 +1,154 @@
+"""Memoization of initializer results across instances.
+
+A descriptor declared with tdl.pr(..., cache=True) (or with an InitCache)
+reuses the value computed by its finit for any instance that calls it with
+the same arguments and the same values of its requirements. The finit
+should only depend on those.
+"""
+import collections
+import copy
+import sys
+import threading
+import types
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "evictions", "maxsize", "currsize", "nbytes"])
+
+
+def deep_sizeof(value, seen=None):
+    """Approximate size in bytes of value, the containers it holds and the
+    attributes of the objects (in their __dict__ or __slots__)."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return sys.getsizeof(value) if nbytes == 0 else nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(ki, seen) + deep_sizeof(vi, seen)
+                    for ki, vi in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(vi, seen) for vi in value)
+    else:
+        if hasattr(value, "__dict__"):
+            size += deep_sizeof(vars(value), seen)
+        size += sum(deep_sizeof(vi, seen) for vi in _slot_values(value))
+    return size
+
+
+def _slot_values(value):
+    # members of the __slots__ of the classes of value that are set
+    for ci in type(value).__mro__:
+        if '__slots__' not in ci.__dict__:
+            continue
+        for member in ci.__dict__.values():
+            if isinstance(member, types.MemberDescriptorType):
+                try:
+                    yield member.__get__(value, type(value))
+                except AttributeError:
+                    pass
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(vi) for vi in value))
+    elif isinstance(value, dict):
+        return (dict, tuple(sorted(
+            (ki, _freeze(vi)) for ki, vi in value.items())))
+    elif isinstance(value, set):
+        return frozenset(_freeze(vi) for vi in value)
+    return (type(value), value)
+
+
+class InitCache(object):
+    """LRU cache of finit results.
+
+    Args:
+        maxsize: maximum number of entries (None for no limit).
+        maxbytes: maximum total size of the entries (None for no limit).
+        getsizeof: function returning the size of a value in bytes,
+            deep_sizeof by default.
+        immutable: the values are never modified, so the same object is
+            shared by all the instances. Otherwise each instance receives a
+            deep copy of the cached value.
+
+    cache_info() reports the hits, misses and evictions. The size of the
+    entries is only measured when maxbytes is given.
+    """
+    def __init__(self, maxsize=128, maxbytes=None, getsizeof=None,
+                 immutable=False):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.getsizeof = deep_sizeof if getsizeof is None else getsizeof
+        self.immutable = immutable
+        self._data = collections.OrderedDict()
+        self._sizes = dict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(desc, obj, args, kargs):
+        """Key of a finit call, None if the arguments are not hashable."""
+        try:
+            key = (desc.finit, _freeze(args), _freeze(kargs),
+                   tuple(_freeze(getattr(obj, ri.name)) for ri in desc.reqs))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _copy(self, value):
+        return value if self.immutable else copy.deepcopy(value)
+
+    def evaluate(self, desc, obj, *args, **kargs):
+        """Return the cached result of desc.finit(obj, *args, **kargs)."""
+        key = self.make_key(desc, obj, args, kargs)
+        if key is not None:
+            with self._lock:
+                if key in self._data:
+                    self.hits += 1
+                    self._data.move_to_end(key)
+                    return self._copy(self._data[key])
+        with self._lock:
+            self.misses += 1
+        value = desc.finit(obj, *args, **kargs)
+        if key is not None:
+            self._insert(key, self._copy(value))
+        return value
+
+    def _insert(self, key, value):
+        size = self.getsizeof(value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        with self._lock:
+            if key in self._data:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self._nbytes += size
+            while (self.maxsize is not None
+                   and len(self._data) > self.maxsize) or \
+                    (self.maxbytes is not None
+                     and self._nbytes > self.maxbytes):
+                old, _ = self._data.popitem(last=False)
+                self._nbytes -= self._sizes.pop(old)
+                self.evictions += 1
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._data), self._nbytes)
+
+    def cache_clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+            self.hits = self.misses = self.evictions = 0
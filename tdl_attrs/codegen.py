@@ -0,0 +1,166 @@
+"""Source generation of class-specific __init__ and build functions.
+
+The generated functions unroll the init plans of a class: the attribute
+names are explicit keyword arguments of __init__ and each finit is called
+in a fixed order, without walking the graph or formatting the user
+arguments on every call. They follow the same protocol as init_wrapper and
+init_graph.
+"""
+import keyword
+import linecache
+from .core import (
+    OrderType, TDLobj, TdlArgs, UserArgs, get_call_args, init_wrapper,
+    make_init_args, _executor, _hooks)
+
+_MISSING = object()
+
+
+def _is_supported(cls, order):
+    """Attribute names are used as argument and variable names, and the
+    generated code only calls synchronous finits and stores the values of
+    attributes that are not evictable."""
+    return all(ni.isidentifier() and not keyword.iskeyword(ni)
+               and not ni.startswith("_tdl_")
+               for ni in cls.__TDL__.graph) and \
+        not any(desc.is_async or desc.evictable is not None
+                for desc in cls.__TDL__.plans[order])
+
+
+def _compile(cls, name, lines, namespace):
+    source = "\n".join(lines) + "\n"
+    filename = f"<tdl generated {name} {cls.__module__}.{cls.__qualname__}>"
+    code = compile(source, filename, "exec")
+    exec(code, namespace)
+    linecache.cache[filename] = (
+        len(source), None, source.splitlines(True), filename)
+    fn = namespace[name]
+    fn.__tdl_source__ = source
+    return fn
+
+
+def _plan_lines(cls, order, indent, user_arg):
+    """Lines initializing the descriptors of an order.
+
+    user_arg(name) returns the expression holding the user argument of
+    the attribute, which should be _tdl_missing when it was not provided.
+    """
+    lines = list()
+    bits = cls.__TDL__.bits
+    for i, desc in enumerate(cls.__TDL__.plans[order]):
+        attr = f"_tdl_self.{desc.private_name}"
+        lines.append(f"{indent}if not _tdl_obj.state & {bits[desc.name]}:")
+        # requirements of the same order are initialized by the plan and
+        # LAZY requirements are initialized by reading them
+        mask = 0
+        for ri in desc.reqs:
+            if ri.order is OrderType.LAZY:
+                lines.append(f"{indent}    if not _tdl_obj.state & "
+                             f"{bits[ri.name]}: _tdl_self.{ri.name}")
+            elif ri.order != order:
+                mask |= bits[ri.name]
+        if mask and not cls.__TDL__.strict:
+            message = ("requirements have not been initialized for "
+                       f"{cls}.{desc.name}")
+            lines.append(f"{indent}    assert _tdl_obj.state & {mask} == "
+                         f"{mask}, {message!r}")
+        arg = user_arg(desc.name)
+        lines += [
+            f"{indent}    _tdl_arg = {arg}",
+            f"{indent}    if _tdl_arg is _tdl_missing:",
+            f"{indent}        {attr} = _tdl_finit_{i}(_tdl_self)",
+            f"{indent}    else:",
+            f"{indent}        _tdl_a, _tdl_k = _tdl_call_arg(_tdl_arg)",
+            f"{indent}        {attr} = _tdl_finit_{i}(_tdl_self, *_tdl_a, "
+            "**_tdl_k)",
+            f"{indent}    _tdl_obj.state |= {bits[desc.name]}",
+            ]
+    return lines
+
+
+def _plan_namespace(cls, order):
+    # cached descriptors are evaluated through the descriptor
+    return {f"_tdl_finit_{i}": (desc.finit if desc.cache is None
+                                else desc.evaluate)
+            for i, desc in enumerate(cls.__TDL__.plans[order])}
+
+
+def make_init(cls, init_fn):
+    """Generate the __init__ of a defined class, which calls init_fn."""
+    if not _is_supported(cls, OrderType.INIT):
+        return init_wrapper(init_fn)
+    names = list(cls.__TDL__.graph)
+    merge = [f"    if {ni} is not _tdl_missing: _tdl_kargs['{ni}'] = {ni}"
+             for ni in names]
+    lines = [
+        "def __init__(_tdl_self, *_tdl_args, "
+        + "".join(f"{ni}=_tdl_missing, " for ni in names)
+        + "**_tdl_kargs):",
+        "  if type(_tdl_self) is not _tdl_cls or _tdl_hooks "
+        "or _tdl_executor.get() is not None:",
+        *merge,
+        "    return _tdl_generic_init(_tdl_self, *_tdl_args, **_tdl_kargs)",
+        "  try:",
+        "    _tdl_obj = _tdl_self.__tdl__",
+        "  except AttributeError:",
+        "    _tdl_obj = _tdl_self.__tdl__ = _tdl_TDLobj()",
+        "  if _tdl_obj.enabled is False:",
+        *merge,
+        "    _tdl_init_fn(_tdl_self, *_tdl_args, **_tdl_kargs)",
+        "    return",
+        "  _tdl_graph = dict()",
+        ]
+    for ni in names:
+        lines += [
+            f"  if {ni} is not _tdl_missing:",
+            f"    _tdl_graph['{ni}'] = {ni} = _tdl_infer({ni})",
+            ]
+    lines += [
+        "  _tdl_user_args = _tdl_UserArgs(",
+        "    init=_tdl_make_init_args(_tdl_args, _tdl_kargs), graph=_tdl_graph)",
+        "  _tdl_obj.user_args = _tdl_user_args",
+        "  if _tdl_cls.__TDL__.registry is not None:",
+        "    _tdl_cls.__TDL__.registry.add(_tdl_self)",
+        "  _tdl_obj.enabled = False",
+        "  _tdl_init_fn(_tdl_self, *_tdl_args, **_tdl_kargs)",
+        "  _tdl_obj.enabled = True",
+        ]
+    lines += _plan_lines(cls, OrderType.INIT, "  ", lambda ni: ni)
+    if cls.__TDL__.retain is not None:
+        lines.append("  _tdl_retain(_tdl_self)")
+    namespace = {
+        "_tdl_cls": cls,
+        "_tdl_missing": _MISSING,
+        "_tdl_init_fn": init_fn,
+        "_tdl_generic_init": init_wrapper(init_fn),
+        "_tdl_executor": _executor,
+        "_tdl_hooks": _hooks,
+        "_tdl_TDLobj": TDLobj,
+        "_tdl_make_init_args": make_init_args,
+        "_tdl_UserArgs": UserArgs,
+        "_tdl_infer": TdlArgs.infer,
+        "_tdl_call_arg": get_call_args,
+        "_tdl_retain": cls.__TDL__.retain,
+        **_plan_namespace(cls, OrderType.INIT),
+        }
+    return _compile(cls, "__init__", lines, namespace)
+
+
+def make_build(cls):
+    """Generate the function that initializes the BUILD plan of a class.
+
+    The function is called by tdl.build with the object and its (already
+    updated) user graph arguments.
+    """
+    if not _is_supported(cls, OrderType.BUILD):
+        return None
+    lines = ["def build(_tdl_self, _tdl_kargs):",
+             "  _tdl_obj = _tdl_self.__tdl__"]
+    lines += _plan_lines(cls, OrderType.BUILD, "  ",
+                         lambda ni: f"_tdl_kargs.get('{ni}', _tdl_missing)")
+    lines += ["  return"]
+    namespace = {
+        "_tdl_missing": _MISSING,
+        "_tdl_call_arg": get_call_args,
+        **_plan_namespace(cls, OrderType.BUILD),
+        }
+    return _compile(cls, "build", lines, namespace)
@@ -0,0 +1,201 @@
+"""Struct-of-arrays storage of a population of tdl objects.
+
+tdl.Collection(cls, n, **kargs) stores each tdl attribute of n objects of
+cls as a column: a numpy array when the values of the rows can be stacked
+(numbers or arrays of the same shape), a list otherwise. Reading an
+attribute of the collection returns the column, and collection[i] returns
+a row view, an instance of a subclass of cls whose tdl attributes read the
+columns:
+
+    dense = tdl.Collection(Dense, 1000, activation="relu")
+    dense.build(units=4, weights={"method": "zeros"})
+    dense.weights.shape     # (1000, 4)
+    dense[3].weights        # row 3 of the column
+    dense[3]([1, 2, 3, 4])  # methods of Dense run on the row
+
+The columns are initialized with, in order of preference:
+
+- a vectorized initializer, declared with @desc.vectorized. It is called
+  as fvector(collection, calls) and returns the whole column. As the
+  requirements read from the collection are columns, finits written with
+  array operations can be used as vectorized initializers.
+- a batch initializer (see TdlDescriptor.batch), called with the rows.
+- the finit, called for each row.
+
+tdl.is_initialized works on the collection and its rows, and tdl.build of
+the collection or of one of its rows builds the whole collection, with the
+arguments shared by all the rows. Methods such as the Dense.__call__ of the
+README, which builds self with the size of its input, run on each row. The
+__init__ of cls is not called for the rows, which only hold the tdl
+attributes.
+"""
+from .core import (
+    OrderType, TDLobj, TdlArgs, UserArgs, get_call_args)
+from .batch import format_configs
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:  # numpy is optional
+        return None
+    return numpy
+
+
+def make_column(values, n):
+    """Array with the values of n rows, or a list when they can not be
+    stacked in an array with a numeric dtype."""
+    np = _numpy()
+    if np is not None:
+        try:
+            column = np.asarray(values)
+        except (ValueError, TypeError):
+            column = None
+        if column is not None and column.dtype != object \
+                and column.shape[:1] == (n,):
+            return column
+    return list(values)
+
+
+class ColumnAttr(object):
+    """Attribute of the row views, reading a row of a column."""
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, objtype):
+        if obj is None:
+            return self
+        return obj._collection.column(self.name)[obj._index]
+
+    def __set__(self, obj, value):
+        raise AttributeError(f"can't set attribute {self.name} of a row of "
+                             "a collection")
+
+
+_row_classes = dict()
+
+
+def row_class(cls):
+    """Subclass of cls used for the row views of collections of cls."""
+    if cls not in _row_classes:
+        body = {ni: ColumnAttr(ni) for ni in cls.__TDL__.graph}
+        body['__slots__'] = ('_collection', '_index')
+        body['__tdl__'] = property(lambda self: self._collection.__tdl__)
+        body['__tdl_collection__'] = property(lambda self: self._collection)
+        _row_classes[cls] = type(f"{cls.__name__}Row", (cls,), body)
+    return _row_classes[cls]
+
+
+class Collection(object):
+    """Population of n objects of the tdl class cls stored as columns.
+
+    Args:
+        cls: class defined with tdl.define.
+        n: number of objects, len(configs) by default.
+        configs: optional list with a dict of user arguments for each row.
+        kargs: user arguments shared by all the rows.
+    The INIT attributes are initialized by the constructor and the BUILD
+    attributes by build().
+    """
+    # read by tdl.build and tdl.is_initialized
+    __tdl_collection__ = property(lambda self: self)
+
+    def __init__(self, cls, n=None, configs=None, **kargs):
+        if n is None:
+            n = 0 if configs is None else len(configs)
+        if configs is None:
+            # the rows share the same (empty) config
+            configs = [dict()]*n
+        if len(configs) != n:
+            raise ValueError(f"{len(configs)} configs given for {n} rows")
+        self.cls = cls
+        self.n = n
+        self.columns = dict()
+        self.__tdl__ = TDLobj()
+        self.__tdl__.user_args = UserArgs(init=TdlArgs(), graph=dict())
+        unique = {id(ci): ci for ci in configs}
+        formatted = dict(zip(unique, format_configs(
+            cls.__TDL__.graph, unique.values())))
+        if any(ui.init.args or ui.init.kargs for ui in formatted.values()) \
+                or any(ki not in cls.__TDL__.graph for ki in kargs):
+            raise TypeError("Collection only takes arguments of the tdl "
+                            f"attributes of {cls.__name__}")
+        # rows with the same config object share their user arguments
+        self.user_args = [formatted[id(ci)].graph for ci in configs]
+        self._update_args(kargs)
+        self._row_class = row_class(cls)
+        self._init_plan(OrderType.INIT)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if not -self.n <= index < self.n:
+            raise IndexError("collection index out of range")
+        row = self._row_class.__new__(self._row_class)
+        row._collection = self
+        row._index = index % self.n
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
+
+    def __getattr__(self, name):
+        cls = self.__dict__.get('cls')
+        if cls is not None and name in cls.__TDL__.graph:
+            return self.column(name)
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def is_initialized(self, name):
+        return self.__tdl__.state & self.cls.__TDL__.bits[name] != 0
+
+    def column(self, name):
+        """Column of the attribute name. LAZY columns are initialized when
+        first read."""
+        if name not in self.columns:
+            desc = getattr(self.cls, name)
+            if desc.order is not OrderType.LAZY:
+                raise AttributeError(
+                    f"{self.cls.__name__}.{name} has not been initialized "
+                    "in the collection")
+            self._init_column(desc)
+        return self.columns[name]
+
+    def _update_args(self, kargs):
+        shared = {ki: TdlArgs.infer(vi) for ki, vi in kargs.items()}
+        unique = {id(ui): ui for ui in self.user_args}
+        for user_args in unique.values():
+            for ki, vi in shared.items():
+                if ki in user_args:
+                    user_args[ki].update_infer(vi)
+                else:
+                    user_args[ki] = TdlArgs(*vi.args, **vi.kargs)
+
+    def _init_column(self, desc):
+        for ri in desc.reqs:
+            if ri.order is OrderType.LAZY:
+                self.column(ri.name)
+        assert all(self.is_initialized(ri.name) for ri in desc.reqs), \
+            f"requirements have not been initialized for {desc.name}"
+        calls = [get_call_args(ui[desc.name]) if desc.name in ui
+                 else ((), dict()) for ui in self.user_args]
+        if desc.fvector is not None:
+            values = desc.fvector(self, calls)
+        elif desc.fbatch is not None:
+            values = desc.fbatch(list(self), calls)
+        else:
+            values = [desc.evaluate(row, *args, **kargs)
+                      for row, (args, kargs) in zip(self, calls)]
+        self.columns[desc.name] = make_column(values, self.n)
+        self.__tdl__.state |= self.cls.__TDL__.bits[desc.name]
+
+    def _init_plan(self, order):
+        for desc in self.cls.__TDL__.plans[order]:
+            if not self.is_initialized(desc.name):
+                self._init_column(desc)
+
+    def build(self, **kargs):
+        """Initialize the BUILD columns, kargs are shared by all rows."""
+        self._update_args(kargs)
+        self._init_plan(OrderType.BUILD)
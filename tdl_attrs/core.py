@@ -1,30 +1,116 @@
 import inspect
 import functools
-import networkx as nx
+import contextlib
+import contextvars
+import threading
 from enum import Enum
 
-from types import SimpleNamespace
+from types import FunctionType
+
+from .graph import DiGraph, CycleError
+from .instrument import hooks as _hooks, timed_call
 
 
 class OrderType(Enum):
     INIT = 1
     MANUAL = 2
     BUILD = 3
+    # initialized the first time the attribute is read
+    LAZY = 4
 
 
 class TDL(object):
-    def __init__(self, graph, init=None):
+    def __init__(self, graph, init=None, bits=None, base=None, added=None):
+        """
+        Args:
+            bits: state bits given by a previous definition of the class.
+            base: TDL of a base class whose graph is extended by graph with
+                the descriptors named in added (see get_tdl_graph).
+        """
         self.graph = graph
         self.init = init
+        extends = base is not None and bits is None
+        # bit of each attribute in the state of the instances. Bits given
+        # by a previous definition of the class or the base are kept.
+        self.bits = dict(base.bits if extends else (bits or ()))
+        for ni in graph:
+            if ni not in self.bits:
+                self.bits[ni] = 1 << len(self.bits)
+        # bits of the requirements of each attribute
+        self.reqs_mask = dict(base.reqs_mask) if extends else dict()
+        for ni in (added if extends else graph):
+            self.reqs_mask[ni] = functools.reduce(
+                lambda mask, ri: mask | self.bits[ri.name],
+                graph.nodes[ni]['desc'].reqs, 0)
+        if extends and not any(ni in base.graph for ni in added):
+            # new attributes can only follow the attributes of the base
+            plans = get_tdl_plans(graph, added)
+            self.plans = {oi: base.plans[oi] + plans[oi] for oi in plans}
+        else:
+            self.plans = get_tdl_plans(graph)
+        # optional generated function that runs the BUILD plan
+        self.build = None
+        # the graph was validated by define(strict=True)
+        self.strict = False
+        # attributes are initialized exactly once by concurrent threads
+        self.threadsafe = False
+        # optional tdl.Retention of the arguments of the instances
+        self.retain = None
+        # optional weak set of the instances (see tdl.memory.track)
+        self.registry = None
+        # attributes that hold child tdl objects (see tdl.nested)
+        self.components = tuple(
+            ni for ni in graph if graph.nodes[ni]['desc'].component)
+        self._closures = dict()
+
+    def _closure(self, names, direction):
+        key = (frozenset(names), direction)
+        if key not in self._closures:
+            for ni in key[0]:
+                if ni not in self.graph:
+                    raise AttributeError(f"{ni} is not a tdl attribute")
+            neighbors = getattr(self.graph, direction)
+            reached = set(key[0]).union(*[neighbors(ni) for ni in key[0]])
+            self._closures[key] = tuple(
+                ni for ni in self.graph.topological_sort() if ni in reached)
+        return self._closures[key]
+
+    def downstream(self, names):
+        """Names in names and of the attributes that depend on them, in
+        topological order."""
+        return self._closure(names, 'descendants')
+
+    def upstream(self, names):
+        """Names in names and of the attributes they depend on, in
+        topological order."""
+        return self._closure(names, 'ancestors')
 
 
 class TDLobj(object):
+    __slots__ = ('enabled', 'user_args', 'state', 'locks')
+
     def __init__(self):
         self.enabled = True
         self.user_args = dict()
+        # bitmask with the initialized attributes (see TDL.bits)
+        self.state = 0
+        # locks of the attributes of threadsafe classes, created on demand
+        self.locks = None
+
+
+class UserArgs(object):
+    __slots__ = ('init', 'graph')
+
+    def __init__(self, init, graph):
+        self.init = init
+        self.graph = graph
 
 
 class TdlArgs(object):
+    __slots__ = ('args', 'kargs')
+    # arguments released by a retention policy (see tdl.retention)
+    released = False
+
     @classmethod
     def infer(cls, args, finit=None):
         if isinstance(args, TdlArgs):
@@ -55,46 +141,153 @@ def _default_setter(self, value):
     return value
 
 
+_UNSET = object()
+
+# caller reported to the instrumentation callbacks (see tdl.instrument)
+_caller = contextvars.ContextVar('tdl_caller', default=None)
+
+
+def call_as(caller, fn, *args, **kargs):
+    """Call fn, reporting the initializations it runs as made by caller."""
+    if not _hooks:
+        return fn(*args, **kargs)
+    token = _caller.set(caller)
+    try:
+        return fn(*args, **kargs)
+    finally:
+        _caller.reset(token)
+
+
+def get_call_args(arg):
+    """Positional and keyword arguments of a finit call for a user arg."""
+    if isinstance(arg, dict):
+        return (), arg
+    elif isinstance(arg, TdlArgs):
+        if arg.released:
+            return arg.resolve()
+        return arg.args, arg.kargs
+    return (arg,), dict()
+
+
+def _required(self, value):
+    return value
+
+
+class _Optional(object):
+    # finit of TdlDescriptor.optional, a class instead of a closure so the
+    # descriptor can be pickled
+    __slots__ = ('default',)
+
+    def __init__(self, default):
+        self.default = default
+
+    # the signature of the bound method is the one of a finit
+    def __call__(optional, self, value=None):
+        if value is None:
+            return optional.default
+        return value
+
+
 class TdlDescriptor(object):
     @classmethod
     def required(cls, order=OrderType.INIT, doc=None):
-        def finit(self, value):
-            return value
-        return cls(finit=finit, order=order, doc=doc, infer_name=False)
+        return cls(finit=_required, order=order, doc=doc, infer_name=False)
 
     @classmethod
     def optional(cls, default=None, order=OrderType.INIT, doc=None):
-        def finit(self, value=None):
-            if value is None:
-                return default
-            return value
-        return cls(finit=finit, order=order, doc=doc, infer_name=False)
+        return cls(finit=_Optional(default), order=order, doc=doc,
+                   infer_name=False)
 
-    def setter(self, fset):
+    def _replace(self, **kargs):
+        """Copy of the descriptor with some arguments replaced."""
+        options = dict(fset=self.fset, doc=self._doc,
+                       concurrent=self.concurrent, cache=self.cache,
+                       fbatch=self.fbatch, fvector=self.fvector,
+                       component=self.component, evictable=self.evictable)
+        options.update(kargs)
         prop = type(self)(self.finit, self.reqs, self.order,
-                          fset=fset,
-                          doc=self.__doc__,
-                          infer_name=False)
+                          infer_name=False, **options)
         prop.update_name(self.name)
         return prop
 
+    def setter(self, fset):
+        return self._replace(fset=fset)
+
+    def batch(self, fbatch):
+        """Initializer of batches of objects, used by tdl.construct_many
+        and tdl.build_many instead of calling finit for each object.
+
+        fbatch(objs, calls) returns the list of values of objs, where calls
+        has the (args, kargs) of the user arguments of each object.
+        """
+        return self._replace(fbatch=fbatch)
+
+    def vectorized(self, fvector):
+        """Initializer of the columns of a tdl.Collection.
+
+        fvector(collection, calls) returns the values of all the rows,
+        where calls has the (args, kargs) of the user arguments of each row.
+        """
+        return self._replace(fvector=fvector)
+
     class Initializer(object):
-        def __init__(self, obj, attr, finit):
-            self._finit = finit
+        __slots__ = ('_obj', '_desc')
+
+        def __init__(self, obj, desc):
             self._obj = obj
-            self._attr = attr
+            self._desc = desc
+
+        @property
+        def __doc__(self):
+            return self._desc.finit.__doc__
 
         def init(self, *args, **kargs):
-            setattr(self._obj, self._attr,
-                    self._finit(self._obj, *args, **kargs))
+            if is_threadsafe(self._obj):
+                # a concurrent call may have initialized the attribute
+                init_once(self._obj, self._desc, self._init, args, kargs)
+            else:
+                self._init(args, kargs)
+
+        def _init(self, args, kargs):
+            # the value is not computed from the user arguments, it can not
+            # be evicted (see tdl.evict)
+            TdlDescriptor.store(self._desc, self._obj, call_as(
+                'init', self._desc.evaluate, self._obj, *args, **kargs))
+
+    def __new__(cls, *args, evictable=None, **kargs):
+        if evictable and cls is TdlDescriptor:
+            from .evict import EvictableDescriptor
+            cls = EvictableDescriptor
+        return super().__new__(cls)
 
     def __init__(self, finit=None, reqs=None, order=OrderType.INIT,
-                 fset=None, doc=None, infer_name=True, allow_set=False):
+                 fset=None, doc=None, infer_name=True, allow_set=False,
+                 concurrent=False, cache=None, fbatch=None, fvector=None,
+                 component=False, evictable=None):
         self.finit = finit
         self.fset = fset
         if allow_set and fset is None:
             self.fset = _default_setter
         self.order = order
+        # finit can run in an executor, concurrently with other finits
+        self.concurrent = concurrent
+        # async finits are only evaluated by tdl.abuild and tdl.acreate
+        self.is_async = inspect.iscoroutinefunction(finit)
+        # memoization of the finit results across instances
+        if cache is True:
+            from .cache import InitCache
+            cache = InitCache()
+        self.cache = cache or None
+        # optional initializers of batches of objects and of the columns
+        # of collections (see batch and vectorized)
+        self.fbatch = fbatch
+        self.fvector = fvector
+        # the value is a tdl object built together with its owner
+        self.component = component
+        # the value can be evicted by a tdl.MemoryManager (see tdl.evict)
+        if evictable is True:
+            from .evict import manager as evictable
+        self.evictable = evictable or None
         if infer_name is True:
             self.name = (None if self.finit is None else finit.__name__)
             self.private_name = f"__tdl__{self.name}"
@@ -105,21 +298,37 @@ class TdlDescriptor(object):
         if self.reqs is None:
             self.reqs = list()
 
-        if not doc and finit is not None:
-            if finit.__doc__:
-                doc = finit.__doc__
+        # the docstring is built from finit when it is first read
+        self._doc = doc
+
+    @property
+    def __doc__(self):
+        if not self._doc and self.finit is not None:
+            if self.finit.__doc__:
+                self._doc = self.finit.__doc__
             else:
                 finit_args = [
-                    arg for arg in inspect.getfullargspec(finit).args
-                    if arg != 'self']
-                doc = (f'Initializer of order {self.order} \n'
-                       f'Args: {finit_args}')
-        self.__doc__ = doc
+                    pi.name for pi in
+                    inspect.signature(self.finit).parameters.values()
+                    if pi.kind in (pi.POSITIONAL_ONLY,
+                                   pi.POSITIONAL_OR_KEYWORD)
+                    and pi.name != 'self']
+                self._doc = (f'Initializer of order {self.order} \n'
+                             f'Args: {finit_args}')
+        return self._doc
 
     def __set_name__(self, owner, name):
+        self.owner = owner
         self.name = name
         self.private_name = f"__tdl__{self.name}"
 
+    def __reduce_ex__(self, protocol):
+        # descriptors of a class are pickled as a reference to the class
+        owner = getattr(self, 'owner', None)
+        if owner is not None and owner.__dict__.get(self.name) is self:
+            return getattr, (owner, self.name)
+        return super().__reduce_ex__(protocol)
+
     def update_name(self, value):
         self.name = value
         self.private_name = f"__tdl__{self.name}"
@@ -127,92 +336,320 @@ class TdlDescriptor(object):
     def __get__(self, obj, objtype):
         if obj is None:
             return self
-        assert self.private_name is not None
-        if not hasattr(obj, self.private_name):
-            value = TdlDescriptor.Initializer(
-                obj=obj, attr=self.private_name, finit=self.finit)
-            value.__doc__ = self.finit.__doc__
-            return value
-        return getattr(obj, self.private_name)
+        value = getattr(obj, self.private_name, _UNSET)
+        if value is _UNSET:
+            if self.order is OrderType.LAZY:
+                return self.init_lazy(obj)
+            return TdlDescriptor.Initializer(obj, self)
+        return value
 
     def __set__(self, obj, value):
         if self.fset is None:
             raise AttributeError(f"can't set attribute {self.name}. "
                                  "No setter specified.")
-        if hasattr(obj, self.private_name):
-            raise AttributeError(f"can't set attribute {self.name}. "
-                                 "Attribute has been already initialized")
-        setattr(obj, self.private_name, self.fset(obj, value))
+        with latch(obj, self.name):
+            if is_initialized(obj, self.name):
+                raise AttributeError(f"can't set attribute {self.name}. "
+                                     "Attribute has been already initialized")
+            # values given by the user can not be evicted (see tdl.evict)
+            TdlDescriptor.store(self, obj, self.fset(obj, value))
+
+    def initialize(self, obj, user_args=None):
+        """Initialize the attribute of obj using its argument in user_args.
+        """
+        if user_args is None or self.name not in user_args:
+            value = self.evaluate(obj)
+        else:
+            args, kargs = get_call_args(user_args[self.name])
+            value = self.evaluate(obj, *args, **kargs)
+        self.store(obj, value)
+
+    def evaluate(self, obj, *args, **kargs):
+        """Evaluate finit for obj without storing the result."""
+        if self.is_async:
+            raise TypeError(
+                f"the initializer of {self.name} is a coroutine function. "
+                "Use tdl.acreate or tdl.abuild to initialize it.")
+        if _hooks:
+            caller = _caller.get() or (
+                '__init__' if self.order is OrderType.INIT else 'build')
+            return timed_call(self._evaluate, obj, self, caller, args, kargs)
+        if self.cache is not None:
+            return self.cache.evaluate(self, obj, *args, **kargs)
+        return self.finit(obj, *args, **kargs)
+
+    def init_lazy(self, obj):
+        """Initialize a LAZY attribute with the arguments given by the user
+        when constructing or building obj."""
+        resolve_reqs(obj, self)
+        user_args = getattr(obj.__tdl__.user_args, 'graph', None)
+        if is_threadsafe(obj):
+            init_once(obj, self, call_as, 'lazy', self.initialize, obj,
+                      user_args)
+        else:
+            call_as('lazy', self.initialize, obj, user_args)
+        return getattr(obj, self.private_name)
+
+    def _evaluate(self, obj, *args, **kargs):
+        if self.cache is not None:
+            return self.cache.evaluate(self, obj, *args, **kargs)
+        return self.finit(obj, *args, **kargs)
+
+    def store(self, obj, value):
+        """Store the value of the attribute and flag it as initialized."""
+        setattr(obj, self.private_name, value)
+        tdl_obj = getattr(obj, '__tdl__', None)
+        if tdl_obj is not None:
+            tdl_obj.state |= type(obj).__TDL__.bits.get(self.name, 0)
+
+    def clear(self, obj):
+        """Delete the value of the attribute (the state is not changed)."""
+        delattr(obj, self.private_name)
 
     def __call__(self, finit=None):
         assert self.finit is None,\
             'the evaluation method has already been specified'
         return type(self)(finit=finit, reqs=self.reqs, order=self.order,
                           fset=self.fset,
-                          doc=self.__doc__)
+                          doc=self._doc,
+                          concurrent=self.concurrent,
+                          cache=self.cache,
+                          fbatch=self.fbatch,
+                          fvector=self.fvector,
+                          component=self.component,
+                          evictable=self.evictable)
 
 
-def get_tdl_graph(cls):
-    graph = nx.DiGraph()
-    for ci in cls.__mro__[::-1]:
+def _defined_base(cls):
+    """Index in cls.__mro__ and TDL of the nearest defined base whose MRO
+    is the tail of the MRO of cls."""
+    mro = cls.__mro__
+    for i, ci in enumerate(mro[1:], 1):
+        tdl = ci.__dict__.get('__TDL__')
+        if tdl is not None and ci.__mro__ == mro[i:]:
+            return i, tdl
+    return len(mro), None
+
+
+def _extend_graph(cls):
+    """Graph of cls, the TDL of the base that it extends (None if the graph
+    was built from scratch) and the names of the descriptors added to the
+    graph of the base."""
+    start, base = _defined_base(cls)
+    graph = DiGraph() if base is None else base.graph.copy()
+    added = dict()
+    for ci in cls.__mro__[:start][::-1]:
         for ni, desc_i in ci.__dict__.items():
             if isinstance(desc_i, TdlDescriptor):
                 if desc_i.name is None:
                     print("WARNING: updating name")
                     desc_i.update_name(ni)
                 graph.add_node(ni, desc=desc_i)
-    for ni in graph.nodes:
+                added[ni] = None
+    for ni in added:
+        # overridden descriptors can have different requirements
+        for nj in list(graph.predecessors(ni)):
+            graph.remove_edge(nj, ni)
+    for ni in added:
         for nj in graph.nodes[ni]['desc'].reqs:
             graph.add_edge(nj.name, ni)
-    assert nx.algorithms.dag.is_directed_acyclic_graph(graph)
-    return graph
+    # cycles in the new graph go through the added descriptors
+    cycle = graph.find_cycle(None if base is None else added)
+    if cycle is not None:
+        raise CycleError(cycle)
+    return graph, base, tuple(added)
+
+
+def get_tdl_graph(cls):
+    """Dependency graph of the tdl descriptors of cls.
+
+    The graph of a defined base is extended with the descriptors of the
+    classes that come before it in the MRO, instead of walking the MRO.
+    """
+    return _extend_graph(cls)[0]
+
+
+def get_tdl_plans(graph, nodes=None):
+    """Return the descriptors of each OrderType in topological order."""
+    plans = {order: list() for order in OrderType}
+    for ni in graph.topological_sort(nodes):
+        desc = graph.nodes[ni]['desc']
+        plans[desc.order].append(desc)
+    return {order: tuple(plan) for order, plan in plans.items()}
 
 
 def is_initialized(obj, attr):
-    # return hasattr(obj, getattr(type(obj), attr).attr)
-    return not isinstance(getattr(obj, attr), TdlDescriptor.Initializer)
+    try:
+        return obj.__tdl__.state & type(obj).__TDL__.bits[attr] != 0
+    except (AttributeError, KeyError):
+        if getattr(type(obj), '__tdl_collection__', None) is not None:
+            return obj.__tdl_collection__.is_initialized(attr)
+        # objects or attributes that are not tracked by a tdl class
+        return hasattr(obj, getattr(type(obj), attr).private_name)
+
+
+def is_threadsafe(obj):
+    tdl = getattr(type(obj), '__TDL__', None)
+    return tdl is not None and tdl.threadsafe
+
+
+# guards the creation of the locks of the attributes
+_locks_lock = threading.Lock()
+
+
+def attr_lock(obj, name=None):
+    """Reentrant lock of the attribute name of obj, or of the object if
+    name is None."""
+    tdl_obj = obj.__tdl__
+    locks = tdl_obj.locks
+    if locks is None or name not in locks:
+        with _locks_lock:
+            if tdl_obj.locks is None:
+                tdl_obj.locks = dict()
+            locks = tdl_obj.locks
+            if name not in locks:
+                locks[name] = threading.RLock()
+    return locks[name]
+
+
+_NO_LOCK = contextlib.nullcontext()
+
+
+def latch(obj, name=None):
+    """attr_lock(obj, name) for objects of threadsafe classes, a context
+    that does nothing for the others."""
+    if is_threadsafe(obj):
+        return attr_lock(obj, name)
+    return _NO_LOCK
+
+
+def init_once(obj, desc, fn, *args, **kargs):
+    """Call fn(*args, **kargs) to initialize desc holding the lock of the
+    attribute, unless it is initialized. Returns False if it was."""
+    with attr_lock(obj, desc.name):
+        if is_initialized(obj, desc.name):
+            return False
+        fn(*args, **kargs)
+        return True
 
 
 def initialize_attr(obj, attr, user_args=None):
-    if attr not in user_args:
-        getattr(obj, attr).init()
-    elif isinstance(user_args[attr], dict):
-        getattr(obj, attr).init(**user_args[attr])
-    elif isinstance(user_args[attr], TdlArgs):
-        getattr(obj, attr).init(*user_args[attr].args, **user_args[attr].kargs)
-    else:
-        getattr(obj, attr).init(user_args[attr])
+    getattr(type(obj), attr).initialize(obj, user_args)
+
+
+def resolve_reqs(obj, desc):
+    """Initialize the LAZY requirements of desc and check the others."""
+    for ri in desc.reqs:
+        if ri.order is OrderType.LAZY and not is_initialized(obj, ri.name):
+            getattr(obj, ri.name)
+    assert all([is_initialized(obj, ri.name) for ri in desc.reqs]), \
+        f"requirements have not been initialized for {type(obj)}.{desc.name}"
 
 
-def init_graph(cls, obj, _tdl_order=OrderType.INIT, **kargs):
+_executor = contextvars.ContextVar('tdl_executor', default=None)
+
+
+@contextlib.contextmanager
+def use_executor(executor):
+    """Initialize the graphs of the objects constructed (or built) in the
+    context using a concurrent.futures executor (see tdl.parallel)."""
+    token = _executor.set(executor)
+    try:
+        yield executor
+    finally:
+        _executor.reset(token)
+
+
+def init_graph(cls, obj, _tdl_order=OrderType.INIT, _tdl_executor=None,
+               **kargs):
     # print("initializing graph")
-    graph = cls.__TDL__.graph
-    for ni in nx.algorithms.dag.topological_sort(graph):
-        desc = graph.nodes[ni]['desc']
-        if desc.order != _tdl_order:
-            continue
-        if is_initialized(obj, ni):
+    if _tdl_executor is None:
+        _tdl_executor = _executor.get()
+    if _tdl_executor is not None:
+        from .parallel import run_plan
+        run_plan(obj, cls.__TDL__.plans[_tdl_order], kargs, _tdl_executor)
+        return
+    tdl_obj = obj.__tdl__
+    bits = cls.__TDL__.bits
+    if cls.__TDL__.threadsafe:
+        _init_plan_once(cls, obj, cls.__TDL__.plans[_tdl_order], kargs)
+        return
+    if cls.__TDL__.strict:
+        # requirements were validated by define(strict=True), LAZY
+        # requirements are initialized when the finit reads them
+        for desc in cls.__TDL__.plans[_tdl_order]:
+            if not tdl_obj.state & bits[desc.name]:
+                desc.initialize(obj, kargs)
+        return
+    reqs_mask = cls.__TDL__.reqs_mask
+    for desc in cls.__TDL__.plans[_tdl_order]:
+        ni = desc.name
+        if tdl_obj.state & bits[ni]:
             continue
         # check reqs are initialized
-        assert all([is_initialized(obj, ri.name) for ri in desc.reqs]), \
-            f"requirements have not been initialized for {cls}.{ni}"
+        if tdl_obj.state & reqs_mask[ni] != reqs_mask[ni]:
+            resolve_reqs(obj, desc)
         # initialize
         initialize_attr(obj, ni, kargs)
 
 
+def _init_plan_once(cls, obj, plan, user_args):
+    # attributes initialized by other threads are skipped, and the threads
+    # initializing an attribute are waited for
+    reqs_mask = cls.__TDL__.reqs_mask
+    for desc in plan:
+        if is_initialized(obj, desc.name):
+            continue
+        mask = reqs_mask[desc.name]
+        if not cls.__TDL__.strict and obj.__tdl__.state & mask != mask:
+            resolve_reqs(obj, desc)
+        init_once(obj, desc, desc.initialize, obj, user_args)
+
+
+# arguments of __init__ calls without arguments are shared by all instances
+_NO_INIT_ARGS = TdlArgs()
+
+
+def make_init_args(args, kargs):
+    if not args and not kargs:
+        return _NO_INIT_ARGS
+    return TdlArgs(*args, **kargs)
+
+
 def format_user_args(graph, args, kargs):
     graph_kargs = {ki: TdlArgs.infer(vi) for ki, vi in kargs.items()
                    if ki in graph}
-    init_kargs = TdlArgs(
-        *args,
-        ** {ki: vi for ki, vi in kargs.items()
-            if ki not in graph_kargs})
-    return SimpleNamespace(
+    init_kargs = make_init_args(
+        args,
+        {ki: vi for ki, vi in kargs.items()
+         if ki not in graph_kargs})
+    return UserArgs(
         init=init_kargs,
         graph=graph_kargs,
         )
 
 
+def init_user(obj, init_fn, args, kargs):
+    """Store the user arguments of obj and call init_fn with the arguments
+    that are not used by the graph. Returns the user arguments."""
+    graph = type(obj).__TDL__.graph
+    user_args = format_user_args(graph, args, kargs)
+    call_init(obj, init_fn, user_args)
+    return user_args
+
+
+def call_init(obj, init_fn, user_args):
+    """Store the formatted user arguments of obj and call init_fn."""
+    obj.__tdl__.user_args = user_args
+    if type(obj).__TDL__.registry is not None:
+        type(obj).__TDL__.registry.add(obj)
+
+    # disable graph init while calling initialization
+    obj.__tdl__.enabled = False
+    init_fn(obj, *user_args.init.args, **user_args.init.kargs)
+    obj.__tdl__.enabled = True
+
+
 def init_wrapper(init_fn):
     @functools.wraps(init_fn)
     def init(obj, *args, **kargs):
@@ -223,46 +660,393 @@ def init_wrapper(init_fn):
             init_fn(obj, *args, **kargs)
             return
 
-        graph = type(obj).__TDL__.graph
-        user_args = format_user_args(graph, args, kargs)
-
-        # disable graph init while calling initialization
-        obj.__tdl__.enabled = False
-        init_fn(obj, *user_args.init.args, **user_args.init.kargs)
-        obj.__tdl__.enabled = True
+        user_args = init_user(obj, init_fn, args, kargs)
         # run graph initialization
         init_graph(type(obj), obj, **user_args.graph)
-        obj.__tdl__.user_args = user_args
+        if type(obj).__TDL__.retain is not None:
+            type(obj).__TDL__.retain(obj)
     return init
 
 
-def build(obj, **kargs):
+def update_user_args(obj, kargs):
+    """Merge build arguments into the user arguments of obj."""
     user_args = obj.__tdl__.user_args.graph
     for ki, vi in kargs.items():
         if ki in user_args:
-            # user_args[ki] should be TdlArgs
             user_args[ki].update_infer(vi)
         else:
-            user_args[ki] = vi
+            # objects built with the same arguments do not share them
+            vi = TdlArgs.infer(vi)
+            user_args[ki] = TdlArgs(*vi.args, **vi.kargs)
+    return user_args
+
+
+def _target_plan(obj, targets, user_args):
+    """Descriptors that have to be initialized to initialize targets."""
+    descs = list()
+    for ni in type(obj).__TDL__.upstream(targets):
+        if is_initialized(obj, ni):
+            continue
+        desc = getattr(type(obj), ni)
+        if desc.order is OrderType.MANUAL and ni not in user_args:
+            raise ValueError(
+                f"{type(obj).__name__}.{ni} is a MANUAL attribute without "
+                f"arguments, initialize it with {ni}.init(...)")
+        descs.append(desc)
+    return descs
+
+
+def plan(obj, targets, **kargs):
+    """Names of the attributes that build(obj, targets=targets, **kargs)
+    would initialize, in the order they would be initialized."""
+    user_args = {**obj.__tdl__.user_args.graph, **kargs}
+    return tuple(desc.name for desc in _target_plan(obj, targets, user_args))
+
+
+def release_args(obj, retain=None):
+    """Release the arguments of obj that are no longer needed, following
+    retain (a policy name or tdl.Retention) or the policy of its class."""
+    if retain is not None:
+        from .retention import Retention
+        retain = Retention.infer(retain)
+    else:
+        retain = type(obj).__TDL__.retain
+    if retain is not None:
+        retain(obj)
+
+
+def build(obj, executor=None, targets=None, retain=None, **kargs):
+    """Initialize the BUILD attributes of obj.
+
+    Args:
+        executor: optional concurrent.futures executor used to run the
+            finits of concurrent descriptors (see tdl.parallel).
+        targets: optional list of attribute names. Only the targets and
+            the attributes they require are initialized, of any order
+            (MANUAL attributes only if their arguments are given).
+        retain: retention policy of the arguments of obj after the build,
+            the policy of the class by default (see tdl.retention).
+        kargs: arguments for the initialization of the attributes.
+    When the class has components (see tdl.nested) and no targets are
+    given, the arguments named after a component are build arguments of
+    the child object, and the whole tree of components is built with a
+    single schedule.
+    A collection (see tdl.Collection) and its rows are built with
+    Collection.build, which shares kargs among all the rows.
+    """
+    if getattr(type(obj), '__tdl_collection__', None) is not None:
+        if executor is not None or targets is not None or retain is not None:
+            raise TypeError("collections are built without executor, "
+                            "targets or retain")
+        obj.__tdl_collection__.build(**kargs)
+        return
+    if targets is None and type(obj).__TDL__.components:
+        from .nested import build_tree
+        call_as('build', build_tree, obj, kargs, executor, retain)
+        return
+    with latch(obj):
+        user_args = update_user_args(obj, kargs)
+    if targets is not None:
+        call_as('build', _build_targets, obj, targets, user_args, executor)
+    elif type(obj).__TDL__.build is not None and executor is None \
+            and _executor.get() is None and not _hooks:
+        type(obj).__TDL__.build(obj, user_args)
+    else:
+        init_graph(type(obj), obj, _tdl_order=OrderType.BUILD,
+                   _tdl_executor=executor, **user_args)
+    if retain is not None or type(obj).__TDL__.retain is not None:
+        release_args(obj, retain)
+
+
+def _build_targets(obj, targets, user_args, executor):
+    descs = _target_plan(obj, targets, user_args)
+    if executor is None:
+        executor = _executor.get()
+    if executor is not None:
+        from .parallel import run_plan
+        run_plan(obj, descs, user_args, executor)
+    elif is_threadsafe(obj):
+        _init_plan_once(type(obj), obj, descs, user_args)
+    else:
+        for desc in descs:
+            desc.initialize(obj, user_args)
+
+
+def invalidate(obj, *attrs):
+    """Clear attrs and the attributes that depend on them.
+
+    Returns the names of the attributes that were initialized.
+    """
+    tdl_obj = obj.__tdl__
+    bits = type(obj).__TDL__.bits
+    cleared = list()
+    for ni in type(obj).__TDL__.downstream(attrs):
+        if tdl_obj.state & bits[ni]:
+            getattr(type(obj), ni).clear(obj)
+            tdl_obj.state &= ~bits[ni]
+            cleared.append(ni)
+    return tuple(cleared)
 
-    init_graph(type(obj), obj, _tdl_order=OrderType.BUILD, **user_args)
 
+def rebuild(obj, *attrs, executor=None, **kargs):
+    """Recompute attributes of obj with new arguments.
 
-def define(cls):
-    graph = get_tdl_graph(cls)
-    if hasattr(cls, '__TDL__') and (
-            cls.__init__ in [bi.__init__ for bi in cls.__bases__]):
+    The arguments in kargs replace the user arguments of their attributes.
+    The attributes in attrs and kargs are invalidated together with the
+    attributes that depend on them. The INIT attributes are computed
+    again, and so are the BUILD attributes that were initialized or are
+    in attrs and kargs (e.g. after tdl.invalidate or a rebuild that
+    raised). LAZY attributes are computed on the next read and MANUAL
+    attributes are left uninitialized.
+
+    Returns the names of the attributes that were cleared (see invalidate).
+    """
+    names = (*attrs, *kargs)
+    cleared = invalidate(obj, *names)
+    user_args = obj.__tdl__.user_args.graph
+    for ki, vi in kargs.items():
+        # the arguments of the caller are not modified by later builds
+        vi = TdlArgs.infer(vi)
+        user_args[ki] = TdlArgs(*vi.args, **vi.kargs)
+    targets = list()
+    for ni in type(obj).__TDL__.downstream(names):
+        order = getattr(type(obj), ni).order
+        if order is OrderType.INIT or (order is OrderType.BUILD and (
+                ni in cleared or ni in names)):
+            targets.append(ni)
+    if targets:
+        _build_targets(obj, targets, user_args, executor)
+    return cleared
+
+
+def _mangle(cls_name, name):
+    if name.startswith('__') and not name.endswith('__') \
+            and cls_name.lstrip('_'):
+        return f"_{cls_name.lstrip('_')}{name}"
+    return name
+
+
+def _replace_class_cells(fn, old_cls, new_cls):
+    if isinstance(fn, (classmethod, staticmethod)):
+        fn = fn.__func__
+    elif isinstance(fn, property):
+        for fi in (fn.fget, fn.fset, fn.fdel):
+            _replace_class_cells(fi, old_cls, new_cls)
+        return
+    elif isinstance(fn, TdlDescriptor):
+        for fi in (fn.finit, fn.fset):
+            _replace_class_cells(fi, old_cls, new_cls)
+        return
+    if not isinstance(fn, FunctionType):
+        return
+    for cell in fn.__closure__ or ():
+        try:
+            if cell.cell_contents is old_cls:
+                cell.cell_contents = new_cls
+        except ValueError:  # empty cell
+            continue
+
+
+def make_slots_class(cls):
+    """Re-create cls with __slots__ for __tdl__ and its descriptors.
+
+    The value of each descriptor is stored in a slot that is accessible
+    with its private name. Slots of base classes are reused, and slots
+    declared by cls are kept.
+    """
+    bases = cls.__mro__[1:]
+    user_slots = cls.__dict__.get('__slots__', ())
+    if isinstance(user_slots, str):
+        user_slots = (user_slots,)
+    slots = list(user_slots)
+    if not any(hasattr(bi, '__tdl__') for bi in bases):
+        slots.append('__tdl__')
+    if not any('__weakref__' in bi.__dict__ for bi in bases):
+        slots.append('__weakref__')
+    private = list()
+    for ci in cls.__mro__[::-1]:
+        for ni, desc_i in ci.__dict__.items():
+            if isinstance(desc_i, TdlDescriptor):
+                pi = f"__tdl__{ni}"
+                if pi not in private and \
+                        not any(hasattr(bi, pi) for bi in bases):
+                    private.append(pi)
+    body = {ki: vi for ki, vi in cls.__dict__.items()
+            if ki not in ('__dict__', '__weakref__')
+            and ki not in [_mangle(cls.__name__, si) for si in user_slots]}
+    body['__slots__'] = tuple(slots + private)
+    body['__qualname__'] = cls.__qualname__
+    try:
+        new_cls = type(cls)(cls.__name__, cls.__bases__, body)
+    except TypeError as error:
+        raise DefinitionError(cls, [
+            f"can't create the slotted class: {error}. Slotted classes "
+            "can not be combined by multiple inheritance"]) from error
+    for pi in private:
+        mangled = _mangle(cls.__name__, pi)
+        member = new_cls.__dict__[mangled]
+        delattr(new_cls, mangled)
+        setattr(new_cls, pi, member)
+    for vi in body.values():
+        _replace_class_cells(vi, cls, new_cls)
+    return new_cls
+
+
+class DefinitionError(ValueError):
+    """Errors found by define(strict=True), in the errors attribute."""
+    def __init__(self, cls, errors):
+        self.errors = errors
+        super().__init__(
+            f"invalid tdl class {cls.__qualname__}:\n  "
+            + "\n  ".join(errors))
+
+
+# stage at which each order is initialized, None if it is not initialized
+# by the graph
+_STAGES = {OrderType.INIT: 0, OrderType.BUILD: 1, OrderType.MANUAL: None}
+
+
+def _stage(graph, name, stages):
+    if name not in stages:
+        desc = graph.nodes[name]['desc']
+        if desc.order is OrderType.LAZY:
+            # LAZY attributes can be read once their requirements are
+            stages[name] = 0
+            for ri in desc.reqs:
+                stage = _stage(graph, ri.name, stages)
+                stages[name] = (None if stage is None or stages[name] is None
+                                else max(stages[name], stage))
+        else:
+            stages[name] = _STAGES[desc.order]
+    return stages[name]
+
+
+def check_graph(cls, graph, init=None):
+    """List of the errors in the definition of the tdl attributes of cls:
+    requirements that are not tdl attributes, requirements that are not
+    initialized before the attribute, finits that do not accept the object
+    and arguments of init that are taken by tdl attributes."""
+    errors = list()
+    stages = dict()
+    for ni in graph:
+        if 'desc' not in graph.nodes[ni]:
+            continue
+        desc = graph.nodes[ni]['desc']
+        name = f"{cls.__name__}.{ni}"
+        for ri in desc.reqs:
+            if 'desc' not in graph.nodes.get(ri.name, ()):
+                errors.append(f"{name} requires {ri.name}, which is not a "
+                              f"tdl attribute of {cls.__name__}")
+                continue
+            if desc.order not in (OrderType.INIT, OrderType.BUILD):
+                continue
+            stage = _stage(graph, ri.name, stages)
+            if stage is None:
+                errors.append(
+                    f"{name} ({desc.order.name}) requires {ri.name}, which "
+                    "is MANUAL or depends on MANUAL attributes")
+            elif stage > _STAGES[desc.order]:
+                errors.append(
+                    f"{name} is initialized at construction (INIT) but "
+                    f"requires {ri.name}, which is initialized by tdl.build")
+        try:
+            params = inspect.signature(desc.finit).parameters.values()
+        except (TypeError, ValueError):
+            continue
+        if not any(pi.kind in (pi.POSITIONAL_ONLY, pi.POSITIONAL_OR_KEYWORD,
+                               pi.VAR_POSITIONAL) for pi in params):
+            errors.append(f"the finit of {name} does not accept the object "
+                          "as first argument")
+    if init is not None:
+        try:
+            params = list(inspect.signature(init).parameters.values())[1:]
+        except (TypeError, ValueError):
+            params = list()
+        for pi in params:
+            if pi.name in graph and pi.kind not in (pi.VAR_POSITIONAL,
+                                                    pi.VAR_KEYWORD):
+                errors.append(
+                    f"the argument {pi.name} of {cls.__name__}.__init__ "
+                    "is a tdl attribute, it is never passed to __init__")
+    return errors
+
+
+def define(cls=None, codegen=False, slots=False, strict=False,
+           threadsafe=False, retain=None):
+    """Configure the initialization of the tdl descriptors of cls.
+
+    Args:
+        codegen: generate the source of a __init__ and build specialized
+            for the class, instead of walking the init plans on each call.
+        slots: re-create the class with __slots__, storing the descriptor
+            values in slots instead of the instance __dict__. As with any
+            slotted class, other instance attributes need to be declared
+            in the __slots__ of the class, and two classes that add slots
+            to a common base can not be combined by multiple inheritance
+            (e.g. diamond hierarchies), Python raises a lay-out conflict
+            when the subclass is created.
+        strict: validate the graph (see check_graph), raising a
+            DefinitionError, and initialize the instances without checking
+            the requirements of each attribute. INIT attributes can only
+            require INIT attributes and BUILD attributes can not require
+            MANUAL attributes (LAZY requirements count as the order of
+            their own requirements).
+        threadsafe: initialize each attribute exactly once when several
+            threads build the same object, initialize it with
+            Initializer.init, set it or read it (LAZY attributes).
+            Threads initializing an attribute hold its lock, and the other
+            threads wait for them and then skip the attribute. Reads of
+            initialized attributes do not take any lock. The generated
+            build of codegen is not used.
+        retain: retention policy of the arguments of the instances, a
+            policy name or a tdl.Retention (see tdl.retention). All the
+            arguments are kept by default.
+    """
+    if cls is None:
+        return functools.partial(define, codegen=codegen, slots=slots,
+                                 strict=strict, threadsafe=threadsafe,
+                                 retain=retain)
+    if slots:
+        cls = make_slots_class(cls)
+    graph, base_tdl, added = _extend_graph(cls)
+    inherit = hasattr(cls, '__TDL__') and (
+        cls.__init__ in [bi.__init__ for bi in cls.__bases__])
+    if inherit:
         base = [bi for bi in cls.__bases__
                 if cls.__init__ == bi.__init__][0]
         if hasattr(base, '__TDL__'):
             init = base.__TDL__.init
         else:
             init = base.__init__
-        cls.__TDL__ = TDL(graph=graph, init=init)
-        # cls.__init__ = init_wrapper(init)
     else:
-        cls.__TDL__ = TDL(graph=graph, init=cls.__init__)
-        cls.__init__ = init_wrapper(cls.__init__)
+        init = cls.__init__
+    if strict:
+        errors = check_graph(cls, graph, init)
+        if errors:
+            raise DefinitionError(cls, errors)
+    previous = cls.__dict__.get('__TDL__')
+    cls.__TDL__ = TDL(graph=graph, init=init,
+                      bits=None if previous is None else previous.bits,
+                      base=base_tdl, added=added)
+    cls.__TDL__.strict = strict
+    cls.__TDL__.threadsafe = threadsafe
+    if retain is not None:
+        from .retention import Retention
+        cls.__TDL__.retain = Retention.infer(retain)
+    if getattr(cls, '__getstate__', None) is \
+            getattr(object, '__getstate__', None) and \
+            not hasattr(cls, '__setstate__'):
+        # instances are pickled with the state given by get_state
+        cls.__getstate__ = get_state
+        cls.__setstate__ = set_state
+    if codegen:
+        from . import codegen as tdl_codegen
+        cls.__init__ = functools.wraps(init)(
+            tdl_codegen.make_init(cls, init))
+        if not threadsafe:
+            cls.__TDL__.build = tdl_codegen.make_build(cls)
+    elif not inherit:
+        cls.__init__ = init_wrapper(init)
     # print([graph.nodes[ni]['desc'].name for ni in graph.nodes])
     return cls
 
@@ -272,3 +1056,67 @@ def get_input_args(obj):
     kargs = {**obj.__tdl__.user_args.init.kargs,
              **obj.__tdl__.user_args.graph}
     return args, kargs
+
+
+def _instance_slots(cls):
+    """Names of the slots of cls that are not managed by tdl."""
+    for ci in cls.__mro__:
+        slots = ci.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for si in slots:
+            if si in ('__dict__', '__weakref__') or si.startswith('__tdl__'):
+                continue
+            yield _mangle(ci.__name__, si)
+
+
+def get_state(obj):
+    """State of a tdl object as a dict with the values of the initialized
+    attributes ('values'), the user arguments ('user_args') and the other
+    instance attributes ('attrs')."""
+    graph = type(obj).__TDL__.graph
+    values = dict()
+    pinned = list()
+    for ni in graph:
+        if is_initialized(obj, ni):
+            desc = graph.nodes[ni]['desc']
+            value = getattr(obj, desc.private_name, _UNSET)
+            if desc.evictable is not None and value is not _UNSET and \
+                    not desc.evictable.tracks(obj, desc):
+                # evictable attributes whose value was given by the user
+                pinned.append(ni)
+            # evicted values are computed again
+            values[ni] = getattr(obj, ni) if value is _UNSET else value
+    attrs = dict()
+    if hasattr(obj, '__dict__'):
+        attrs.update({ki: vi for ki, vi in obj.__dict__.items()
+                      if not ki.startswith('__tdl__')})
+    for si in _instance_slots(type(obj)):
+        value = getattr(obj, si, _UNSET)
+        if value is not _UNSET:
+            attrs[si] = value
+    state = {'values': values,
+             'user_args': obj.__tdl__.user_args,
+             'attrs': attrs}
+    if pinned:
+        state['pinned'] = pinned
+    return state
+
+
+def set_state(obj, state):
+    """Restore a state given by get_state, usually on an object created
+    with cls.__new__ (no __init__ or graph initialization is run)."""
+    obj.__tdl__ = TDLobj()
+    obj.__tdl__.user_args = state['user_args']
+    if type(obj).__TDL__.registry is not None:
+        type(obj).__TDL__.registry.add(obj)
+    for ki, vi in state['attrs'].items():
+        object.__setattr__(obj, ki, vi)
+    graph = type(obj).__TDL__.graph
+    pinned = state.get('pinned', ())
+    for ni, vi in state['values'].items():
+        desc = graph.nodes[ni]['desc']
+        if ni in pinned:
+            TdlDescriptor.store(desc, obj, vi)
+        else:
+            desc.store(obj, vi)
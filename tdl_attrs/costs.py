@@ -0,0 +1,265 @@
+"""Cost model of the initializations, and cost-aware schedules.
+
+A CostModel is a tdl.instrument callback that keeps an estimate of the
+duration of each finit (and of its memory, when tdl.memory.trace_allocations
+is active) per class and attribute. The estimates can be saved to a json
+file and loaded in other processes:
+
+    with tdl.instrument(tdl.costs.model):
+        tdl.build(model)
+    tdl.costs.model.save("costs.json")
+
+    tdl.costs.model.load("costs.json")
+    tdl.explain(Model)          # schedule, critical path and total time
+    tdl.costs.optimize(Model)   # order the plans longest path first
+
+The critical path of a plan is the path of its dependency graph with the
+largest estimated duration, a lower bound of the time to run the plan with
+any number of workers. optimize orders the ties of the topological order
+of the plans by the estimated duration of the longest path that starts at
+each attribute, so the executor of tdl.parallel starts the longest chains
+of concurrent attributes first. Attributes without estimates count as the
+default duration of the model.
+"""
+import collections
+import functools
+import heapq
+import json
+import sys
+import threading
+
+from .core import OrderType
+
+Estimate = collections.namedtuple(
+    "Estimate", ["count", "duration", "memory"])
+
+
+def _class_name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class CostModel(object):
+    """Estimates of the cost of the finits per class and attribute.
+
+    Args:
+        alpha: weight of a new measurement in the exponential moving
+            average of the estimates (1.0 keeps the last measurement).
+        default: duration in seconds of the attributes without estimate.
+    """
+    def __init__(self, alpha=0.3, default=0.0):
+        self.alpha = alpha
+        self.default = default
+        self._lock = threading.Lock()
+        self.estimates = dict()
+
+    def _average(self, old, new):
+        if old is None:
+            return new
+        if new is None:
+            return old
+        return old + self.alpha*(new - old)
+
+    def __call__(self, event):
+        if event.error is not None:
+            return
+        key = (_class_name(event.cls), event.attr)
+        with self._lock:
+            entry = self.estimates.get(key)
+            if entry is None:
+                entry = Estimate(0, None, None)
+            self.estimates[key] = Estimate(
+                entry.count + 1,
+                self._average(entry.duration, event.duration),
+                self._average(entry.memory, event.memory))
+
+    def estimate(self, cls, attr):
+        """Estimate of attr for cls, or of the nearest base class of cls
+        with one. None if there is no estimate."""
+        for ci in cls.__mro__:
+            entry = self.estimates.get((_class_name(ci), attr))
+            if entry is not None:
+                return entry
+        return None
+
+    def duration(self, cls, attr):
+        entry = self.estimate(cls, attr)
+        return self.default if entry is None else entry.duration
+
+    def save(self, path):
+        with self._lock:
+            data = {"alpha": self.alpha, "default": self.default,
+                    "estimates": [[cls, attr, *entry] for (cls, attr), entry
+                                  in self.estimates.items()]}
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+
+    def load(self, path):
+        """Load the estimates saved in path, replacing the estimates of the
+        same attributes."""
+        with open(path) as file:
+            data = json.load(file)
+        with self._lock:
+            for cls, attr, *entry in data["estimates"]:
+                self.estimates[(cls, attr)] = Estimate(*entry)
+        return self
+
+    def clear(self):
+        with self._lock:
+            self.estimates.clear()
+
+
+# process-wide cost model used by default
+model = CostModel()
+
+
+def _plan_graph(cls, order):
+    """Descriptors of the plan and the requirements of each one that are
+    in the plan."""
+    plan = cls.__TDL__.plans[order]
+    names = {desc.name for desc in plan}
+    return plan, {desc.name: [ri.name for ri in desc.reqs
+                              if ri.name in names] for desc in plan}
+
+
+def path_lengths(cls, order=OrderType.BUILD, costs=None):
+    """Estimated duration of the longest path of the plan that starts at
+    each attribute (including the attribute)."""
+    costs = model if costs is None else costs
+    plan, reqs = _plan_graph(cls, order)
+    lengths = dict()
+    for desc in reversed(plan):
+        lengths[desc.name] = costs.duration(cls, desc.name)
+    for desc in reversed(plan):
+        for ri in reqs[desc.name]:
+            lengths[ri] = max(lengths[ri], costs.duration(cls, ri)
+                              + lengths[desc.name])
+    return lengths
+
+
+def critical_path(cls, order=OrderType.BUILD, costs=None):
+    """Names of the attributes of the critical path of the plan and its
+    estimated duration."""
+    costs = model if costs is None else costs
+    plan, reqs = _plan_graph(cls, order)
+    finish = dict()
+    previous = dict()
+    for desc in plan:
+        start = 0.0
+        previous[desc.name] = None
+        for ri in reqs[desc.name]:
+            if finish[ri] > start or previous[desc.name] is None:
+                start = max(start, finish[ri])
+                previous[desc.name] = ri
+        finish[desc.name] = start + costs.duration(cls, desc.name)
+    if not finish:
+        return (), 0.0
+    name = max(finish, key=lambda ni: finish[ni])
+    total = finish[name]
+    path = list()
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return tuple(path[::-1]), total
+
+
+def ordered_plan(cls, order=OrderType.BUILD, costs=None):
+    """Plan in topological order where the attributes that are ready at
+    the same time are ordered by the length of their longest path."""
+    plan, reqs = _plan_graph(cls, order)
+    lengths = path_lengths(cls, order, costs)
+    index = {desc.name: i for i, desc in enumerate(plan)}
+    waiting = {desc.name: len(reqs[desc.name]) for desc in plan}
+    users = {desc.name: list() for desc in plan}
+    for ni, reqs_i in reqs.items():
+        for ri in reqs_i:
+            users[ri].append(ni)
+    ready = [(-lengths[ni], index[ni], ni) for ni, count in waiting.items()
+             if count == 0]
+    heapq.heapify(ready)
+    output = list()
+    while ready:
+        _, _, name = heapq.heappop(ready)
+        output.append(plan[index[name]])
+        for ui in users[name]:
+            waiting[ui] -= 1
+            if waiting[ui] == 0:
+                heapq.heappush(ready, (-lengths[ui], index[ui], ui))
+    return tuple(output)
+
+
+def optimize(cls, costs=None):
+    """Order the INIT and BUILD plans of cls with ordered_plan. The
+    functions generated by define(codegen=True) are generated again."""
+    tdl = cls.__TDL__
+    tdl.plans = dict(tdl.plans)
+    for order in (OrderType.INIT, OrderType.BUILD):
+        tdl.plans[order] = ordered_plan(cls, order, costs)
+    from . import codegen
+    if hasattr(cls.__dict__.get('__init__'), '__tdl_source__'):
+        cls.__init__ = functools.wraps(tdl.init)(
+            codegen.make_init(cls, tdl.init))
+    if tdl.build is not None:
+        tdl.build = codegen.make_build(cls)
+    return cls
+
+
+def simulate(cls, order=OrderType.BUILD, costs=None, parallel=True):
+    """Predicted schedule of the plan as a list of (name, start, end).
+
+    The attributes run in plan order in the calling thread, except the
+    concurrent attributes when parallel is True, which start as soon as
+    they are ready (as with an executor with enough workers, see
+    tdl.parallel).
+    """
+    costs = model if costs is None else costs
+    plan, reqs = _plan_graph(cls, order)
+    pending = list(plan)
+    now = 0.0
+    done = dict()
+    running = dict()
+    schedule = list()
+    while pending or running:
+        progress = True
+        while progress:
+            progress = False
+            for desc in list(pending):
+                if not all(ri in done for ri in reqs[desc.name]):
+                    continue
+                pending.remove(desc)
+                end = now + costs.duration(cls, desc.name)
+                schedule.append((desc.name, now, end))
+                if parallel and desc.concurrent:
+                    running[desc.name] = end
+                else:
+                    now = done[desc.name] = end
+                    progress = True
+        if not running:
+            break
+        now = max(now, min(running.values()))
+        for ni in [ni for ni, end in running.items() if end <= now]:
+            done[ni] = running.pop(ni)
+    return schedule
+
+
+def explain(cls, order=OrderType.BUILD, costs=None, parallel=True,
+            file=None):
+    """Print the predicted schedule of the plan of cls, its critical path
+    and its estimated total time."""
+    costs = model if costs is None else costs
+    file = sys.stdout if file is None else file
+    schedule = simulate(cls, order, costs, parallel)
+    path, length = critical_path(cls, order, costs)
+    print(f"{order.name} plan of {_class_name(cls)}:", file=file)
+    print(f"{'attribute':<40} {'start ms':>10} {'end ms':>10}", file=file)
+    for name, start, end in schedule:
+        desc = getattr(cls, name)
+        notes = [note for note, flag in (
+            ("concurrent", desc.concurrent),
+            ("critical", name in path),
+            ("no estimate", costs.estimate(cls, name) is None)) if flag]
+        print(f"{name:<40} {1e3*start:>10.3f} {1e3*end:>10.3f}"
+              + (f"  ({', '.join(notes)})" if notes else ""), file=file)
+    total = max([end for _, _, end in schedule], default=0.0)
+    print(f"critical path: {' -> '.join(path)} ({1e3*length:.3f} ms)",
+          file=file)
+    print(f"estimated total: {1e3*total:.3f} ms", file=file)
@@ -0,0 +1,175 @@
+"""Evictable attributes.
+
+The values of descriptors declared with tdl.pr(..., evictable=True) are
+tracked by a process-wide MemoryManager (tdl.evict.manager). When the total
+size of the tracked values exceeds the budget of the manager, the least
+recently used values of all the instances are evicted, and the next read of
+an evicted attribute computes it again with its finit, the user arguments
+of the object and its requirements (evicted requirements are computed
+again as well). Evicted attributes remain initialized:
+
+    tdl.evict.manager.budget = 1 << 30
+
+    @tdl.define
+    class Model(object):
+        units = tdl.pr.required(order=tdl.BUILD)
+
+        @tdl.pr(reqs=[units], order=tdl.BUILD, evictable=True)
+        def table(self, size=1024):
+            return make_table(self.units, size)
+
+    tdl.evict.manager.info()  # evictions, rematerializations, ...
+
+Descriptors can use their own manager with evictable=MemoryManager(...).
+Evictable attributes should be cheap to compute and only depend on their
+arguments and requirements, and the arguments need to be kept (see
+tdl.retention). Only the values computed from the user arguments are
+evicted: the values given to a setter or to Initializer.init (MANUAL
+attributes) are never evicted.
+"""
+import collections
+import threading
+import weakref
+
+from .cache import deep_sizeof
+from .core import (
+    TdlDescriptor, call_as, get_call_args, is_initialized, latch, _UNSET)
+
+EvictionInfo = collections.namedtuple(
+    "EvictionInfo",
+    ["evictions", "rematerializations", "budget", "currsize", "nbytes"])
+
+
+class MemoryManager(object):
+    """LRU of the values of evictable attributes across all instances.
+
+    Args:
+        budget: maximum total size in bytes of the values (None for no
+            limit). When a value is stored and the total exceeds the
+            budget, the least recently used values are evicted, except the
+            value stored.
+        getsizeof: function returning the size of a value in bytes,
+            deep_sizeof by default.
+    """
+    def __init__(self, budget=None, getsizeof=None):
+        self.budget = budget
+        self.getsizeof = getsizeof or deep_sizeof
+        self._lock = threading.RLock()
+        # (id(obj), name) -> (weak reference to obj, desc, nbytes)
+        self._entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.evictions = 0
+        self.rematerializations = 0
+
+    def info(self):
+        with self._lock:
+            return EvictionInfo(self.evictions, self.rematerializations,
+                                self.budget, len(self._entries), self.nbytes)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+        return entry
+
+    def _collected(self, key, ref):
+        # the object was garbage collected
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                self._remove(key)
+
+    def add(self, obj, desc, value):
+        """Track the value of desc in obj, evicting values if the budget
+        is exceeded."""
+        nbytes = self.getsizeof(value)
+        key = (id(obj), desc.name)
+        with self._lock:
+            self._remove(key)
+            ref = weakref.ref(obj, lambda ref: self._collected(key, ref))
+            self._entries[key] = (ref, desc, nbytes)
+            self.nbytes += nbytes
+            if self.budget is not None and self.nbytes > self.budget:
+                self._evict(self.budget, keep=1)
+
+    def touch(self, obj, desc):
+        """Mark the value of desc in obj as the most recently used."""
+        try:
+            self._entries.move_to_end((id(obj), desc.name))
+        except KeyError:
+            pass
+
+    def tracks(self, obj, desc):
+        """True if the value of desc in obj is tracked."""
+        return (id(obj), desc.name) in self._entries
+
+    def discard(self, obj, desc):
+        """Stop tracking the value of desc in obj."""
+        with self._lock:
+            self._remove((id(obj), desc.name))
+
+    def _evict(self, limit, keep=0):
+        while self.nbytes > limit and len(self._entries) > keep:
+            key = next(iter(self._entries))
+            ref, desc, _ = self._remove(key)
+            obj = ref()
+            if obj is None:
+                continue
+            try:
+                delattr(obj, desc.private_name)
+            except AttributeError:
+                continue
+            self.evictions += 1
+
+    def evict(self, limit=None):
+        """Evict the least recently used values until their total size is
+        at most limit (the budget by default, 0 evicts all the values)."""
+        with self._lock:
+            self._evict(self.budget if limit is None else limit)
+
+    def __repr__(self):
+        return f"MemoryManager(budget={self.budget}, nbytes={self.nbytes})"
+
+
+# manager of the descriptors declared with evictable=True
+manager = MemoryManager()
+
+
+class EvictableDescriptor(TdlDescriptor):
+    """Descriptor whose value is tracked by the MemoryManager in evictable,
+    and computed again when it is read after an eviction."""
+    def __get__(self, obj, objtype):
+        if obj is None:
+            return self
+        value = getattr(obj, self.private_name, _UNSET)
+        if value is _UNSET:
+            if is_initialized(obj, self.name):
+                return self.rematerialize(obj)
+            return super().__get__(obj, objtype)
+        self.evictable.touch(obj, self)
+        return value
+
+    def store(self, obj, value):
+        super().store(obj, value)
+        self.evictable.add(obj, self, value)
+
+    def clear(self, obj):
+        self.evictable.discard(obj, self)
+        if hasattr(obj, self.private_name):
+            super().clear(obj)
+
+    def rematerialize(self, obj):
+        """Compute the evicted value of the attribute again."""
+        with latch(obj, self.name):
+            value = getattr(obj, self.private_name, _UNSET)
+            if value is not _UNSET:
+                return value
+            user_args = getattr(obj.__tdl__.user_args, 'graph', dict())
+            args, kargs = get_call_args(user_args[self.name]) \
+                if self.name in user_args else ((), dict())
+            value = call_as('rematerialize', self.evaluate, obj,
+                            *args, **kargs)
+            self.store(obj, value)
+        with self.evictable._lock:
+            self.evictable.rematerializations += 1
+        return value
@@ -0,0 +1,157 @@
+"""Minimal directed graph used to order the descriptors of a tdl class.
+
+The dependency graphs of tdl classes are small, so this module keeps only
+the handful of operations used by tdl (nodes with attributes, edges,
+topological sort and cycle detection). networkx is only needed to export
+a graph with DiGraph.to_networkx.
+"""
+
+
+class CycleError(ValueError):
+    def __init__(self, cycle):
+        self.cycle = list(cycle)
+        super().__init__(
+            "dependency graph has a cycle: "
+            + " -> ".join(str(ni) for ni in self.cycle))
+
+
+class DiGraph(object):
+    def __init__(self):
+        # dicts keep the insertion order, which is used to break ties
+        # when sorting the graph
+        self.nodes = dict()
+        self._succ = dict()
+        self._pred = dict()
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add_node(self, node, **attr):
+        if node not in self.nodes:
+            self.nodes[node] = dict()
+            self._succ[node] = dict()
+            self._pred[node] = dict()
+        self.nodes[node].update(attr)
+
+    def add_edge(self, u, v):
+        self.add_node(u)
+        self.add_node(v)
+        self._succ[u][v] = None
+        self._pred[v][u] = None
+
+    def remove_edge(self, u, v):
+        del self._succ[u][v]
+        del self._pred[v][u]
+
+    @property
+    def edges(self):
+        return [(u, v) for u, succ in self._succ.items() for v in succ]
+
+    def successors(self, node):
+        return iter(self._succ[node])
+
+    def predecessors(self, node):
+        return iter(self._pred[node])
+
+    @staticmethod
+    def _reachable(node, adjacency):
+        seen = set()
+        stack = [node]
+        while stack:
+            for vi in adjacency[stack.pop()]:
+                if vi not in seen:
+                    seen.add(vi)
+                    stack.append(vi)
+        return seen
+
+    def descendants(self, node):
+        """Set of the nodes reachable from node."""
+        return self._reachable(node, self._succ)
+
+    def ancestors(self, node):
+        """Set of the nodes from which node is reachable."""
+        return self._reachable(node, self._pred)
+
+    def copy(self):
+        graph = type(self)()
+        graph.nodes = {ni: dict(attr) for ni, attr in self.nodes.items()}
+        graph._succ = {ni: dict(succ) for ni, succ in self._succ.items()}
+        graph._pred = {ni: dict(pred) for ni, pred in self._pred.items()}
+        return graph
+
+    def find_cycle(self, roots=None):
+        """Return a list [n0, n1, ..., n0] with a cycle or None.
+
+        Args:
+            roots: optional nodes where the search starts. Only the cycles
+                that go through one of them are found.
+        """
+        color = dict.fromkeys(self.nodes, 0)
+        for root in (self.nodes if roots is None else roots):
+            if color[root]:
+                continue
+            color[root] = 1
+            path = [root]
+            stack = [iter(self._succ[root])]
+            while stack:
+                for node in stack[-1]:
+                    if color[node] == 1:
+                        return path[path.index(node):] + [node]
+                    if color[node] == 0:
+                        color[node] = 1
+                        path.append(node)
+                        stack.append(iter(self._succ[node]))
+                        break
+                else:
+                    color[path.pop()] = 2
+                    stack.pop()
+        return None
+
+    def is_directed_acyclic_graph(self):
+        return self.find_cycle() is None
+
+    def topological_sort(self, nodes=None):
+        """Kahn's algorithm. Raises CycleError if the graph is not a DAG.
+
+        Args:
+            nodes: optional subset of the nodes. Only the subgraph induced
+                by them is sorted.
+        """
+        if nodes is None:
+            indegree = {ni: len(pred) for ni, pred in self._pred.items()}
+        else:
+            indegree = dict.fromkeys(nodes, 0)
+            for ni in indegree:
+                indegree[ni] = sum(pi in indegree for pi in self._pred[ni])
+        ready = [ni for ni, di in indegree.items() if di == 0]
+        order = list()
+        while ready:
+            # sort level by level, keeping the insertion order in each level
+            next_ready = list()
+            for ni in ready:
+                order.append(ni)
+                for nj in self._succ[ni]:
+                    if nj not in indegree:
+                        continue
+                    indegree[nj] -= 1
+                    if indegree[nj] == 0:
+                        next_ready.append(nj)
+            ready = next_ready
+        if len(order) != len(indegree):
+            raise CycleError(self.find_cycle())
+        return order
+
+    def to_networkx(self):
+        """Export the graph as a networkx.DiGraph (requires networkx)."""
+        import networkx as nx
+        graph = nx.DiGraph()
+        for node, attr in self.nodes.items():
+            graph.add_node(node, **attr)
+        graph.add_edges_from(self.edges)
+        return graph
@@ -0,0 +1,187 @@
+"""Tracing of attribute initializations.
+
+Callbacks registered with tdl.instrument receive an InitEvent after each
+finit call. When no callback is registered the cost is a single check of
+the hooks list per initialized attribute.
+
+    stats = tdl.InitStats()
+    trace = tdl.ChromeTrace()
+    with tdl.instrument(stats), tdl.instrument(trace):
+        model = Model(...)
+        tdl.build(model, ...)
+    print(stats.report())
+    trace.dump("trace.json")  # open with chrome://tracing or Perfetto
+"""
+import collections
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# registered callbacks, checked by the initialization code
+hooks = list()
+# active tdl.memory.trace_allocations contexts
+memory_tracers = list()
+
+InitEvent = collections.namedtuple(
+    "InitEvent",
+    ["cls", "attr", "order", "caller", "start", "duration", "args",
+     "thread", "error", "memory"],
+    defaults=(None,))
+InitEvent.__doc__ = """Initialization of an attribute.
+
+    cls: class of the object, attr: attribute name, order: OrderType,
+    caller: '__init__', 'build', 'lazy', 'init' (Initializer.init),
+    'acreate', 'abuild' or 'rematerialize' (see tdl.evict),
+    start: time.perf_counter() at the start, duration: seconds,
+    args: short summary of the finit arguments, thread: thread identifier,
+    error: exception raised by finit or None, memory: bytes allocated by
+    the finit and still traced by tracemalloc when it returns (None unless
+    tdl.memory.trace_allocations is active).
+    """
+
+
+def summarize(args, kargs, width=80):
+    """Short representation of the arguments of a finit call."""
+    text = ", ".join([repr(ai) for ai in args]
+                     + [f"{ki}={vi!r}" for ki, vi in kargs.items()])
+    return text if len(text) <= width else text[:width-3] + "..."
+
+
+def emit(event):
+    for hook in list(hooks):
+        hook(event)
+
+
+def _traced_memory():
+    return tracemalloc.get_traced_memory()[0] if memory_tracers else None
+
+
+def _event(obj, desc, caller, start, args, kargs, error, memory):
+    if memory is not None:
+        memory = _traced_memory() - memory
+    return InitEvent(
+        type(obj), desc.name, desc.order, caller, start,
+        time.perf_counter() - start, summarize(args, kargs),
+        threading.get_ident(), error, memory)
+
+
+def timed_call(fn, obj, desc, caller, args, kargs):
+    """Call fn(obj, *args, **kargs) and emit its InitEvent."""
+    memory = _traced_memory()
+    start = time.perf_counter()
+    error = None
+    try:
+        return fn(obj, *args, **kargs)
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        emit(_event(obj, desc, caller, start, args, kargs, error, memory))
+
+
+async def atimed_call(fn, obj, desc, caller, args, kargs):
+    """Await fn(obj, *args, **kargs) and emit its InitEvent."""
+    memory = _traced_memory()
+    start = time.perf_counter()
+    error = None
+    try:
+        return await fn(obj, *args, **kargs)
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        emit(_event(obj, desc, caller, start, args, kargs, error, memory))
+
+
+class instrument(object):
+    """Register callback(event) for each InitEvent.
+
+    Can be used as a context manager, or removed with remove().
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        hooks.append(callback)
+
+    def remove(self):
+        if self.callback in hooks:
+            hooks.remove(self.callback)
+
+    def __enter__(self):
+        return self.callback
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+
+class InitStats(object):
+    """Callback that aggregates the duration of the initializations per
+    class and attribute."""
+    Entry = collections.namedtuple(
+        "Entry", ["count", "total", "min", "max"])
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = dict()
+
+    def __call__(self, event):
+        key = (f"{event.cls.__module__}.{event.cls.__qualname__}",
+               event.attr)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.Entry(0, 0.0, event.duration, event.duration)
+            self.entries[key] = self.Entry(
+                entry.count + 1, entry.total + event.duration,
+                min(entry.min, event.duration),
+                max(entry.max, event.duration))
+
+    def by_class(self):
+        """Total time and count of initializations of each class."""
+        output = dict()
+        for (cls, _), entry in self.entries.items():
+            count, total = output.get(cls, (0, 0.0))
+            output[cls] = (count + entry.count, total + entry.total)
+        return output
+
+    def report(self):
+        lines = [f"{'attribute':<60} {'count':>8} {'total ms':>10} "
+                 f"{'mean us':>10} {'max us':>10}"]
+        for (cls, attr), entry in sorted(
+                self.entries.items(), key=lambda item: -item[1].total):
+            lines.append(
+                f"{cls + '.' + attr:<60} {entry.count:>8} "
+                f"{1e3*entry.total:>10.3f} "
+                f"{1e6*entry.total/entry.count:>10.1f} "
+                f"{1e6*entry.max:>10.1f}")
+        return "\n".join(lines)
+
+
+class ChromeTrace(object):
+    """Callback that records the events in the Chrome trace-event format.
+    """
+    def __init__(self):
+        self.events = list()
+
+    def __call__(self, event):
+        self.events.append({
+            "name": f"{event.cls.__qualname__}.{event.attr}",
+            "cat": event.caller,
+            "ph": "X",
+            "ts": 1e6*event.start,
+            "dur": 1e6*event.duration,
+            "pid": os.getpid(),
+            "tid": event.thread,
+            "args": {"order": event.order.name, "args": event.args,
+                     "error": None if event.error is None
+                     else repr(event.error)},
+            })
+
+    def to_json(self):
+        return {"traceEvents": list(self.events),
+                "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file)
@@ -0,0 +1,187 @@
+"""Memory accounting of tdl objects.
+
+tdl.memory_report(obj_or_cls, ...) measures the deep size (see deep_sizeof)
+of the values of the tdl attributes of objects, of their user arguments
+and of their TDLobj, aggregated per class and attribute:
+
+    tdl.memory.track(Dense)          # weak registry of the instances
+    ...
+    report = tdl.memory_report(Dense)
+    print(report.report())           # e.g. Dense.weights, 40000, 3 GB
+
+The instances of a class are read from its registry when the class is
+tracked (instances created before tdl.memory.track are not registered),
+and otherwise found with a scan of gc.get_objects(). Values shared by
+several attributes or instances are counted once, by the first attribute
+measured. Evicted values (see tdl.evict) are not counted.
+
+With trace_allocations, the memory allocated by each finit and still held
+when it returns is measured with tracemalloc and aggregated per class and
+attribute. Allocations of nested initializations are included in the
+outer finit, and allocations made by other threads while a finit runs
+are counted in it:
+
+    with tdl.memory.trace_allocations() as allocations:
+        model = Model(...)
+        tdl.build(model)
+    print(allocations.report())
+"""
+import collections
+import contextlib
+import gc
+import threading
+import tracemalloc
+import weakref
+
+from .cache import deep_sizeof
+from .core import _UNSET
+from . import instrument
+
+USER_ARGS = "<user_args>"
+TDLOBJ = "<TDLobj>"
+
+
+def track(cls):
+    """Register the instances of cls created from now on in a weak set,
+    cls.__TDL__.registry."""
+    if cls.__TDL__.registry is None:
+        cls.__TDL__.registry = weakref.WeakSet()
+    return cls.__TDL__.registry
+
+
+def untrack(cls):
+    cls.__TDL__.registry = None
+
+
+def instances(cls):
+    """Instances of cls, from its registry if it is tracked."""
+    registry = cls.__TDL__.registry
+    if registry is not None:
+        return list(registry)
+    return [obj for obj in gc.get_objects() if type(obj) is cls]
+
+
+def _class_name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _format_bytes(nbytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(nbytes) < 1024 or unit == "GB":
+            break
+        nbytes /= 1024
+    return f"{nbytes:.1f} {unit}"
+
+
+class MemoryReport(object):
+    """Bytes held by tdl objects per class and attribute.
+
+    entries maps (class name, attribute) to an Entry with the number of
+    instances that hold a value and its total size in bytes. The user
+    arguments and the TDLobj of the objects are reported as the attributes
+    '<user_args>' and '<TDLobj>'.
+    """
+    Entry = collections.namedtuple("Entry", ["count", "nbytes"])
+
+    def __init__(self):
+        self.entries = dict()
+        self._seen = set()
+
+    def add(self, cls, attr, value):
+        key = (_class_name(cls), attr)
+        count, nbytes = self.entries.get(key, (0, 0))
+        self.entries[key] = self.Entry(
+            count + 1, nbytes + deep_sizeof(value, self._seen))
+
+    def add_object(self, obj):
+        cls = type(obj)
+        for ni, desc in cls.__TDL__.graph.nodes.items():
+            value = getattr(obj, desc['desc'].private_name, _UNSET)
+            if value is not _UNSET:
+                self.add(cls, ni, value)
+        tdl_obj = getattr(obj, '__tdl__', None)
+        if tdl_obj is not None:
+            self.add(cls, USER_ARGS, tdl_obj.user_args)
+            self.add(cls, TDLOBJ, tdl_obj)
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self.entries.values())
+
+    def by_class(self):
+        """Total bytes of each class."""
+        output = dict()
+        for (cls, _), entry in self.entries.items():
+            output[cls] = output.get(cls, 0) + entry.nbytes
+        return output
+
+    def report(self):
+        lines = [f"{'attribute':<60} {'count':>8} {'total':>10} "
+                 f"{'mean':>10}"]
+        for (cls, attr), entry in sorted(
+                self.entries.items(), key=lambda item: -item[1].nbytes):
+            lines.append(
+                f"{cls + '.' + attr:<60} {entry.count:>8} "
+                f"{_format_bytes(entry.nbytes):>10} "
+                f"{_format_bytes(entry.nbytes/entry.count):>10}")
+        return "\n".join(lines)
+
+
+def memory_report(*targets):
+    """MemoryReport of the tdl objects in targets. Classes in targets are
+    replaced by their instances (see instances)."""
+    report = MemoryReport()
+    for target in targets:
+        objs = instances(target) if isinstance(target, type) else [target]
+        for obj in objs:
+            report.add_object(obj)
+    return report
+
+
+class AllocationStats(object):
+    """Callback of tdl.instrument that aggregates the memory allocated by
+    the finits per class and attribute (see trace_allocations)."""
+    Entry = collections.namedtuple("Entry", ["count", "nbytes", "max"])
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = dict()
+
+    def __call__(self, event):
+        if event.memory is None:
+            return
+        key = (_class_name(event.cls), event.attr)
+        with self._lock:
+            count, nbytes, peak = self.entries.get(key, (0, 0, event.memory))
+            self.entries[key] = self.Entry(
+                count + 1, nbytes + event.memory, max(peak, event.memory))
+
+    def report(self):
+        lines = [f"{'attribute':<60} {'count':>8} {'total':>10} "
+                 f"{'max':>10}"]
+        for (cls, attr), entry in sorted(
+                self.entries.items(), key=lambda item: -item[1].nbytes):
+            lines.append(
+                f"{cls + '.' + attr:<60} {entry.count:>8} "
+                f"{_format_bytes(entry.nbytes):>10} "
+                f"{_format_bytes(entry.max):>10}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def trace_allocations(stats=None):
+    """Measure the memory allocated by the finits called in the context,
+    starting tracemalloc if it is not tracing. Yields the AllocationStats.
+    """
+    stats = AllocationStats() if stats is None else stats
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    instrument.memory_tracers.append(stats)
+    try:
+        with instrument.instrument(stats):
+            yield stats
+    finally:
+        instrument.memory_tracers.remove(stats)
+        if started:
+            tracemalloc.stop()
@@ -0,0 +1,151 @@
+"""Nested tdl components.
+
+A descriptor declared with tdl.pr(..., component=True) holds a child tdl
+object, and tdl.build on the parent builds the whole tree of components:
+
+    @tdl.define
+    class Model(object):
+        @tdl.pr(component=True)
+        def encoder(self, activation=None):
+            return Dense(activation=activation)
+
+        @tdl.pr(component=True)
+        def decoder(self):
+            return Dense()
+
+        @tdl.pr(reqs=[encoder, decoder], order=tdl.BUILD)
+        def size(self):
+            return self.encoder.units + self.decoder.units
+
+    model = Model(encoder={"activation": "relu"})
+    tdl.build(model, encoder={"units": 64}, decoder={"units": 32})
+
+The keyword arguments of tdl.build named after a component are the build
+arguments of the child (a dict, nested for the components of the child),
+while the arguments given at construction are the arguments of the finit.
+The BUILD attributes of the objects of the tree are compiled into a single
+schedule: the attributes of a child are built once the component is
+initialized, and the attributes of the parent that require the component
+once the child is built. Subtrees that are already built are skipped, and
+with an executor (see tdl.parallel) the concurrent attributes of
+independent subtrees run at the same time. Components initialized during
+the build (BUILD components) are added to the schedule when they are
+initialized. LAZY and MANUAL components that are not initialized are not
+built.
+"""
+from .core import (
+    OrderType, TdlArgs, is_initialized, latch, release_args,
+    update_user_args, _executor)
+from .parallel import run_nodes
+
+
+def _child_args(obj, name, value):
+    value = TdlArgs.infer(value)
+    if value.args:
+        raise TypeError(
+            f"the build arguments of the component {type(obj).__name__}."
+            f"{name} must be given as keyword arguments")
+    return value.kargs
+
+
+class Schedule(object):
+    """Schedule of the BUILD attributes of a tree of components.
+
+    The nodes are keyed by the path of their object in the tree followed by
+    the attribute name, e.g. ('encoder', 'weights').
+    """
+    def __init__(self):
+        # components initialized during the build, with their owner, build
+        # arguments and the nodes that wait for their subtree
+        self.pending = dict()
+        # keys of the nodes of each object in the tree
+        self.objects = dict()
+        self.tree = list()
+
+    def add(self, obj, kargs, path=(), waiters=frozenset()):
+        """Nodes of obj and of its components, and the keys to add to the
+        deps of the nodes in waiters."""
+        tdl = type(obj).__TDL__
+        children = {ni: _child_args(obj, ni, kargs[ni])
+                    for ni in tdl.components if ni in kargs}
+        with latch(obj):
+            user_args = update_user_args(
+                obj, {ki: vi for ki, vi in kargs.items()
+                      if ki not in children})
+        plan = tdl.plans[OrderType.BUILD]
+        names = {desc.name for desc in plan}
+        nodes = {path + (desc.name,): (
+                    obj, desc, user_args,
+                    {path + (ri.name,) for ri in desc.reqs
+                     if ri.name in names})
+                 for desc in plan}
+        self.objects[id(obj)] = set(nodes)
+        self.tree.append(obj)
+        extra = {wi: set(nodes) for wi in waiters}
+        for ni in tdl.components:
+            # the nodes of obj that require the component wait for its
+            # subtree, as the nodes that wait for the subtree of obj
+            component_waiters = waiters | {
+                path + (desc.name,) for desc in plan
+                if any(ri.name == ni for ri in desc.reqs)}
+            if is_initialized(obj, ni):
+                child_nodes, child_extra = self.add_child(
+                    obj, ni, children.pop(ni, dict()), path + (ni,),
+                    component_waiters)
+                nodes.update(child_nodes)
+                for ki, vi in child_extra.items():
+                    extra.setdefault(ki, set()).update(vi)
+            elif ni in names:
+                self.pending[path + (ni,)] = (
+                    obj, children.pop(ni, dict()), component_waiters)
+        if children:
+            raise ValueError(
+                f"can't build the components {', '.join(children)} of "
+                f"{type(obj).__name__}, which are not initialized")
+        return nodes, extra
+
+    def start(self, obj, kargs):
+        """Nodes of the tree of obj, the root of the schedule."""
+        nodes, extra = self.add(obj, kargs)
+        for ki, vi in extra.items():
+            nodes[ki][3].update(vi)
+        return nodes
+
+    def add_child(self, obj, name, kargs, path, waiters):
+        child = getattr(obj, name)
+        if not hasattr(type(child), '__TDL__'):
+            if kargs:
+                raise TypeError(
+                    f"the component {type(obj).__name__}.{name} is not a "
+                    "tdl object")
+            return dict(), dict()
+        if id(child) in self.objects:
+            # components shared in the tree are built once
+            if kargs:
+                with latch(child):
+                    update_user_args(child, kargs)
+            keys = self.objects[id(child)]
+            return dict(), {wi: set(keys) for wi in waiters}
+        return self.add(child, kargs, path, waiters)
+
+    def expand(self, key):
+        """New nodes when the node key is initialized (see run_nodes)."""
+        if key not in self.pending:
+            return dict(), dict()
+        obj, kargs, waiters = self.pending.pop(key)
+        return self.add_child(obj, key[-1], kargs, key, waiters)
+
+
+def build_tree(obj, kargs, executor=None, retain=None):
+    """Build obj and its components with the build arguments in kargs.
+
+    retain is the retention policy of the arguments of the objects in the
+    tree, the policy of their class by default (see tdl.retention).
+    """
+    if executor is None:
+        executor = _executor.get()
+    schedule = Schedule()
+    with latch(obj):
+        run_nodes(schedule.start(obj, kargs), executor, schedule.expand)
+    for obj in schedule.tree:
+        release_args(obj, retain)
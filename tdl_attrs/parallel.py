@@ -0,0 +1,243 @@
+"""Concurrent initialization of the attributes of a tdl object.
+
+Descriptors declared with tdl.pr(..., concurrent=True) run their finit in a
+concurrent.futures executor as soon as their requirements are initialized,
+while the other descriptors run in the calling thread. Values are stored in
+the calling thread, so the object is only read by the executor.
+
+With a ProcessPoolExecutor, the object and the arguments are pickled and
+the finit runs on a copy of the object.
+
+For the classes defined with tdl.define(threadsafe=True), the plans of an
+object are run one at a time, and each attribute is initialized holding its
+lock until its value is stored.
+
+tdl.parallel_build(objs, processes=N) builds whole objects in worker
+processes: each object is pickled (see tdl.get_state) and built in a
+worker, which sends back only the values of the attributes it initialized
+in the object and in its components.
+"""
+import concurrent.futures
+import itertools
+import pickle
+
+from .core import (
+    attr_lock, build, get_call_args, is_initialized, is_threadsafe, latch,
+    release_args, resolve_reqs, update_user_args)
+
+
+def _run_finit(cls, name, obj, args, kargs):
+    # resolve the finit from the class so the call can be pickled
+    return getattr(cls, name).evaluate(obj, *args, **kargs)
+
+
+def run_plan(obj, plan, user_args, executor):
+    """Initialize the descriptors in plan that are not initialized.
+
+    Args:
+        obj: tdl object.
+        plan: descriptors in topological order.
+        user_args: dict with the user arguments of the attributes.
+        executor: concurrent.futures executor.
+    Raises:
+        The exception raised by the first failing descriptor in plan order.
+        Descriptors that finished before the failure remain initialized.
+    """
+    names = {desc.name for desc in plan}
+    nodes = {desc.name: (obj, desc, user_args,
+                         {ri.name for ri in desc.reqs if ri.name in names})
+             for desc in plan}
+    with latch(obj):
+        run_nodes(nodes, executor)
+
+
+def run_nodes(nodes, executor, expand=None):
+    """Initialize the attributes of a schedule of nodes, which can belong
+    to different objects.
+
+    Args:
+        nodes: dict {key: (obj, desc, user_args, deps)} in topological
+            order, where deps has the keys of the nodes that have to be
+            initialized before the node.
+        executor: concurrent.futures executor used for the concurrent
+            descriptors, None to run all the finits in the calling thread.
+        expand: optional function called with the key of each node that
+            is initialized, returning the new nodes to schedule and a dict
+            with the keys to add to the deps of the scheduled nodes.
+    Raises:
+        The exception raised by the first failing node in schedule order.
+    """
+    pending = dict()
+    deps = dict()
+    order = dict()
+    done = set()
+    running = dict()
+    errors = dict()
+    # locks held by the nodes of threadsafe objects being initialized
+    locks = dict()
+
+    def add(new_nodes, extra_deps=None):
+        for key, (obj, desc, user_args, node_deps) in new_nodes.items():
+            order[key] = len(order)
+            if is_initialized(obj, desc.name):
+                done.add(key)
+                continue
+            pending[key] = (obj, desc, user_args)
+            deps[key] = set(node_deps)
+        for key, keys in (extra_deps or dict()).items():
+            if key in pending:
+                deps[key].update(keys)
+
+    def finish(key):
+        done.add(key)
+        if expand is not None:
+            add(*expand(key))
+
+    def release(key):
+        if key in locks:
+            locks.pop(key).release()
+
+    add(nodes)
+    while pending or running:
+        progress = True
+        while progress and not errors:
+            progress = False
+            for key in list(pending):
+                if not deps[key] <= done:
+                    continue
+                obj, desc, user_args = pending.pop(key)
+                if is_threadsafe(obj):
+                    locks[key] = attr_lock(obj, desc.name)
+                    locks[key].acquire()
+                try:
+                    if key in locks and is_initialized(obj, desc.name):
+                        # initialized by another thread
+                        release(key)
+                        finish(key)
+                        progress = True
+                        continue
+                    resolve_reqs(obj, desc)
+                    args, kargs = get_call_args(user_args[desc.name]) \
+                        if desc.name in user_args else ((), dict())
+                    if desc.concurrent and executor is not None:
+                        future = executor.submit(
+                            _run_finit, type(obj), desc.name, obj,
+                            args, kargs)
+                        running[future] = key, obj, desc
+                        continue
+                    try:
+                        desc.store(obj, desc.evaluate(obj, *args, **kargs))
+                    finally:
+                        release(key)
+                    finish(key)
+                    progress = True
+                except Exception as error:
+                    release(key)
+                    errors[order[key]] = error
+                    break
+        if errors:
+            pending = dict()
+        if not running:
+            break
+        finished, _ = concurrent.futures.wait(
+            running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in finished:
+            key, obj, desc = running.pop(future)
+            try:
+                desc.store(obj, future.result())
+                finish(key)
+            except Exception as error:
+                errors[order[key]] = error
+            finally:
+                release(key)
+    if errors:
+        raise errors[min(errors)]
+
+
+def _tree_states(obj, states):
+    """Record the state of obj and of its initialized components."""
+    if id(obj) in states or not hasattr(type(obj), '__TDL__'):
+        return
+    states[id(obj)] = obj.__tdl__.state
+    for ni in type(obj).__TDL__.components:
+        if is_initialized(obj, ni):
+            _tree_states(getattr(obj, ni), states)
+
+
+def _tree_values(obj, states, seen):
+    """Values initialized by the build in obj, and the trees of values of
+    the components that were initialized before the build (None for the
+    components shared in the tree, which are sent once)."""
+    tdl = type(obj).__TDL__
+    before = states[id(obj)]
+    values = {ni: getattr(obj, ni) for ni, bit in tdl.bits.items()
+              if obj.__tdl__.state & bit and not before & bit}
+    children = dict()
+    for ni in tdl.components:
+        if not before & tdl.bits[ni]:
+            continue
+        child = getattr(obj, ni)
+        if id(child) not in states:
+            continue
+        if id(child) in seen:
+            children[ni] = None
+        else:
+            seen.add(id(child))
+            children[ni] = _tree_values(child, states, seen)
+    return values, children
+
+
+def _build_values(obj, kargs, copy=False):
+    """Build obj (a copy of obj if copy is True) and return the values
+    of the attributes initialized in its tree of components."""
+    if copy:
+        obj = pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+    states = dict()
+    _tree_states(obj, states)
+    build(obj, **kargs)
+    return _tree_values(obj, states, {id(obj)})
+
+
+def _store_tree(obj, kargs, tree):
+    """Merge the build arguments and store the values sent by a worker in
+    obj and in its components."""
+    from .nested import _child_args
+    components = type(obj).__TDL__.components
+    update_user_args(obj, {ki: vi for ki, vi in kargs.items()
+                           if ki not in components})
+    if tree is None:
+        return
+    values, children = tree
+    for ni, vi in values.items():
+        getattr(type(obj), ni).store(obj, vi)
+    for ni, child in children.items():
+        _store_tree(getattr(obj, ni),
+                    _child_args(obj, ni, kargs[ni]) if ni in kargs else {},
+                    child)
+    release_args(obj)
+
+
+def parallel_build(objs, processes=None, executor=None, **kargs):
+    """Same as calling tdl.build(obj, **kargs) for each object in objs,
+    building the objects in worker processes.
+
+    Args:
+        processes: number of processes of the ProcessPoolExecutor created
+            when no executor is given (os.cpu_count() by default).
+        executor: optional concurrent.futures executor. The executors that
+            are not a ProcessPoolExecutor build a copy of each object.
+    Changes made by the finits to attributes that are not tdl attributes
+    are not sent back. The components of the objects (see tdl.nested) are
+    built as with tdl.build.
+    """
+    objs = list(objs)
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            return parallel_build(objs, executor=executor, **kargs)
+    workers = getattr(executor, '_max_workers', None) or 1
+    copy = not isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+    results = executor.map(
+        _build_values, objs, itertools.repeat(kargs), itertools.repeat(copy),
+        chunksize=max(1, len(objs) // (4*workers)))
+    for obj, tree in zip(objs, results):
+        _store_tree(obj, kargs, tree)
@@ -0,0 +1,173 @@
+"""Retention of the arguments of tdl objects.
+
+The arguments given to the constructor and to tdl.build are kept by the
+object (see tdl.get_input_args) for its whole lifetime. A retention policy
+releases the arguments that are no longer needed to initialize the object:
+the arguments of __init__ and the arguments of the initialized attributes,
+after the construction and after each build. The arguments of the
+attributes that are not initialized (e.g. BUILD attributes before
+tdl.build, LAZY and MANUAL attributes) are kept.
+
+    @tdl.define(retain="summary")
+    class Model(object):
+        ...
+
+    tdl.build(model, retain="drop", weights=large_array)
+
+Policies:
+
+- "all": keep the arguments.
+- "summary": values larger than the threshold are replaced by an
+  ArgSummary with their type, size and sha256 digest, so the input
+  arguments still identify the values (e.g. to compare objects). The
+  summaries are not the arguments: tdl.SnapshotCache.save raises for
+  released objects, while tdl.SnapshotCache.construct keys the objects by
+  the arguments given before they are released.
+- "weak": values larger than the threshold are referenced with a WeakArg,
+  a weak reference that can be called to get the value while it is alive.
+  Values that do not support weak references are summarized.
+- "drop": all the values are replaced by an ArgSummary without digest.
+
+tdl.Retention(policy, threshold) sets the threshold, in bytes as measured
+by deep_sizeof. Released arguments can not initialize an attribute again
+(e.g. after tdl.rebuild or tdl.invalidate), which raises a ValueError
+unless new arguments are given, except the weak references that are alive.
+"""
+import collections
+import hashlib
+import pickle
+import weakref
+
+from .cache import deep_sizeof
+from .core import TdlArgs, UserArgs, get_call_args, is_initialized
+
+ArgSummary = collections.namedtuple(
+    "ArgSummary", ["type", "nbytes", "digest"])
+ArgSummary.__doc__ = """Summary of a released argument: name of its type,
+    size in bytes and sha256 digest of its pickle (None if it was not
+    computed or the value can not be pickled)."""
+
+
+def _type_name(value):
+    return f"{type(value).__module__}.{type(value).__qualname__}"
+
+
+def _digest(value):
+    try:
+        data = pickle.dumps(value, protocol=4)
+    except Exception:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+class WeakArg(weakref.ref):
+    """Weak reference to a released argument, with its summary."""
+    __slots__ = ('summary',)
+
+    def __new__(cls, value, summary):
+        return super().__new__(cls, value)
+
+    def __init__(self, value, summary):
+        super().__init__(value)
+        self.summary = summary
+
+    def __repr__(self):
+        return f"WeakArg({self.summary})"
+
+
+class ReleasedArgs(TdlArgs):
+    """Arguments of an attribute released by a retention policy."""
+    __slots__ = ()
+    released = True
+
+    def resolve(self):
+        """Positional and keyword arguments with the values of the weak
+        references. Raises ValueError if a value was released."""
+        return (tuple(self._resolve(vi) for vi in self.args),
+                {ki: self._resolve(vi) for ki, vi in self.kargs.items()})
+
+    @staticmethod
+    def _resolve(value):
+        if isinstance(value, WeakArg):
+            summary = value.summary
+            value = value()
+            if value is None:
+                value = summary
+        if isinstance(value, ArgSummary):
+            raise ValueError(
+                f"the argument {value} was released by the retention "
+                "policy of the object, give it again to initialize the "
+                "attribute")
+        return value
+
+    def update_infer(self, args):
+        # arguments given again replace the released ones
+        self.args = ()
+        self.kargs = dict()
+        super().update_infer(args)
+
+
+class Retention(object):
+    """Retention policy of the arguments of tdl objects.
+
+    Args:
+        policy: "all", "summary", "weak" or "drop".
+        threshold: size in bytes of the values that are summarized or
+            weakly referenced by the "summary" and "weak" policies.
+    """
+    POLICIES = ("all", "summary", "weak", "drop")
+
+    @classmethod
+    def infer(cls, retain):
+        """Retention of retain, a Retention, a policy name or None."""
+        if retain is None or isinstance(retain, Retention):
+            return retain
+        return cls(retain)
+
+    def __init__(self, policy="summary", threshold=1 << 10):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown retention policy {policy!r}, "
+                             f"expected one of {self.POLICIES}")
+        self.policy = policy
+        self.threshold = threshold
+
+    def __repr__(self):
+        return f"Retention({self.policy!r}, threshold={self.threshold})"
+
+    def release_value(self, value):
+        if isinstance(value, (ArgSummary, WeakArg)):
+            return value
+        nbytes = deep_sizeof(value)
+        if self.policy == "drop":
+            return ArgSummary(_type_name(value), nbytes, None)
+        if nbytes < self.threshold:
+            return value
+        if self.policy == "weak":
+            try:
+                return WeakArg(value, ArgSummary(
+                    _type_name(value), nbytes, None))
+            except TypeError:  # no weak references to the value
+                pass
+        return ArgSummary(_type_name(value), nbytes, _digest(value))
+
+    def release(self, arg):
+        """Released user argument, arg if nothing was released."""
+        args, kargs = (arg.args, arg.kargs) if isinstance(arg, TdlArgs) \
+            else get_call_args(arg)
+        new_args = tuple(self.release_value(vi) for vi in args)
+        new_kargs = {ki: self.release_value(vi) for ki, vi in kargs.items()}
+        if all(ni is vi for ni, vi in zip(new_args, args)) and \
+                all(new_kargs[ki] is vi for ki, vi in kargs.items()):
+            return arg
+        return ReleasedArgs(*new_args, **new_kargs)
+
+    def __call__(self, obj):
+        """Release the arguments of obj that are no longer needed."""
+        user_args = obj.__tdl__.user_args
+        if self.policy == "all" or not isinstance(user_args, UserArgs):
+            return
+        user_args.init = self.release(user_args.init)
+        graph = user_args.graph
+        for ni, arg in graph.items():
+            if is_initialized(obj, ni):
+                graph[ni] = self.release(arg)
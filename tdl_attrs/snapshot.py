@@ -0,0 +1,174 @@
+"""Snapshots of initialized tdl objects on disk.
+
+tdl.snapshot(obj, path) writes the initialized attributes, the user
+arguments and the other instance attributes of obj to the directory path.
+Large numpy arrays and buffers (bytes, bytearray, memoryview) are written
+to their own files, and tdl.restore memory-maps them read-only, so
+processes restoring the same snapshot share the pages. Restored numpy
+arrays are read-only memmaps and restored buffers are read-only
+memoryviews. numpy is optional.
+
+SnapshotCache keys snapshots by the class and the input arguments of the
+objects (see tdl.get_input_args), so a matching construction is restored
+without running __init__ or the graph initialization.
+"""
+import hashlib
+import mmap
+import os
+import pickle
+import sys
+
+from .core import (
+    TdlArgs, UserArgs, format_user_args, get_input_args, get_state,
+    set_state)
+
+STATE_FILE = "state.pkl"
+
+
+class _MappedValue(object):
+    """Placeholder for a value stored in its own file."""
+    def __init__(self, filename, kind):
+        self.filename = filename
+        self.kind = kind
+
+
+def _class_id(cls):
+    return (cls.__module__, cls.__qualname__)
+
+
+def _dump_value(name, value, path, threshold):
+    # values can only be arrays if numpy was imported
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(value, np.ndarray) \
+            and value.dtype != object and value.nbytes >= threshold:
+        filename = f"{name}.npy"
+        np.save(os.path.join(path, filename), value, allow_pickle=False)
+        return _MappedValue(filename, "ndarray")
+    if isinstance(value, (bytes, bytearray, memoryview)) \
+            and len(value) >= threshold:
+        filename = f"{name}.bin"
+        with open(os.path.join(path, filename), "wb") as file:
+            file.write(value)
+        return _MappedValue(filename, "buffer")
+    return value
+
+
+def _load_value(value, path):
+    if not isinstance(value, _MappedValue):
+        return value
+    filename = os.path.join(path, value.filename)
+    if value.kind == "ndarray":
+        try:
+            import numpy as np
+        except ImportError:  # numpy is optional
+            raise ImportError(f"numpy is required to restore {filename}")
+        return np.load(filename, mmap_mode="r")
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def snapshot(obj, path, threshold=1 << 16):
+    """Write the state of obj to the directory path.
+
+    Args:
+        threshold: arrays and buffers with at least this many bytes are
+            stored in their own memory-mappable file.
+    """
+    os.makedirs(path, exist_ok=True)
+    state = get_state(obj)
+    state['values'] = {
+        ni: _dump_value(ni, vi, path, threshold)
+        for ni, vi in state['values'].items()}
+    state['class'] = _class_id(type(obj))
+    # the state file is written last, so incomplete snapshots are not loaded
+    tmp = os.path.join(path, STATE_FILE + ".tmp")
+    with open(tmp, "wb") as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, os.path.join(path, STATE_FILE))
+
+
+def restore(cls, path):
+    """Create an instance of cls from a snapshot without running __init__
+    or initializing the graph."""
+    with open(os.path.join(path, STATE_FILE), "rb") as file:
+        state = pickle.load(file)
+    if state.pop('class') != _class_id(cls):
+        raise ValueError(f"the snapshot in {path} is not an instance of "
+                         f"{cls.__module__}.{cls.__qualname__}")
+    state['values'] = {ni: _load_value(vi, path)
+                       for ni, vi in state['values'].items()}
+    obj = cls.__new__(cls)
+    set_state(obj, state)
+    return obj
+
+
+def _canonical(value):
+    if isinstance(value, TdlArgs):
+        return (TdlArgs, _canonical(value.args), _canonical(value.kargs))
+    elif isinstance(value, dict):
+        return (dict, tuple(sorted(
+            (ki, _canonical(vi)) for ki, vi in value.items())))
+    elif isinstance(value, (list, tuple)):
+        return (type(value), tuple(_canonical(vi) for vi in value))
+    return value
+
+
+class SnapshotCache(object):
+    """Directory of snapshots keyed by class and input arguments."""
+    def __init__(self, directory, threshold=1 << 16):
+        self.directory = directory
+        self.threshold = threshold
+
+    def key(self, cls, args, kargs):
+        """Key of the instance of cls with input arguments (args, kargs),
+        in the format returned by tdl.get_input_args."""
+        graph = cls.__TDL__.graph
+        user_args = format_user_args(graph, args, kargs)
+        data = pickle.dumps(
+            (_class_id(cls), _canonical(user_args.init),
+             _canonical(user_args.graph)),
+            protocol=4)
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, cls, args, kargs):
+        return os.path.join(self.directory, self.key(cls, args, kargs))
+
+    def _restore(self, cls, path):
+        if not os.path.exists(os.path.join(path, STATE_FILE)):
+            return None
+        return restore(cls, path)
+
+    def load(self, cls, *args, **kargs):
+        """Restore the instance of cls with the given input arguments,
+        None if it is not in the cache."""
+        return self._restore(cls, self.path(cls, args, kargs))
+
+    def save(self, obj):
+        """Snapshot obj under the key of its input arguments. Raises
+        ValueError if arguments of obj were released by a retention policy
+        (see tdl.retention), use construct instead."""
+        user_args = obj.__tdl__.user_args
+        if isinstance(user_args, UserArgs) and any(
+                getattr(ai, 'released', False)
+                for ai in (user_args.init, *user_args.graph.values())):
+            raise ValueError(
+                f"the input arguments of {type(obj).__name__} were released "
+                "by its retention policy, they can not be used as a key")
+        args, kargs = get_input_args(obj)
+        path = self.path(type(obj), args, kargs)
+        snapshot(obj, path, self.threshold)
+        return path
+
+    def construct(self, cls, *args, **kargs):
+        """Restore cls(*args, **kargs) from the cache, or construct it and
+        save it. The key is computed from the given arguments, so objects
+        whose arguments are released by a retention policy are cached."""
+        path = self.path(cls, args, kargs)
+        obj = self._restore(cls, path)
+        if obj is None:
+            obj = cls(*args, **kargs)
+            snapshot(obj, path, self.threshold)
+        return obj
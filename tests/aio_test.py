@@ -0,0 +1,96 @@
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+import tdl_attrs as tdl
+
+
+class AioTest(unittest.TestCase):
+    def test_acreate(self):
+        events = list()
+
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1])
+            async def test_a2(self, value=2.0):
+                events.append("start test_a2")
+                await asyncio.sleep(0.01)
+                events.append("end test_a2")
+                return value*self.test_a1
+
+            @tdl.pr(reqs=[test_a1])
+            async def test_a3(self, value=3.0):
+                events.append("start test_a3")
+                await asyncio.sleep(0.01)
+                events.append("end test_a3")
+                return value*self.test_a1
+
+            @tdl.pr(reqs=[test_a2, test_a3])
+            def test_a4(self):
+                return self.test_a2 + self.test_a3
+
+            def __init__(self, value):
+                self.value = value
+
+        model = asyncio.run(tdl.acreate(ModelA, "value", test_a1=1.0,
+                                        test_a3=tdl.ar(4.0)))
+        assert model.value == "value"
+        assert model.test_a4 == 6.0
+        assert events[:2] == ["start test_a2", "start test_a3"]
+        args, kargs = tdl.get_input_args(model)
+        assert args == ("value",) and kargs["test_a3"].args == (4.0,)
+
+        with self.assertRaises(TypeError):
+            ModelA("value", test_a1=1.0)
+
+    def test_abuild(self):
+        @tdl.define
+        class ModelA(object):
+            units = tdl.pr.required(order=tdl.BUILD)
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            async def weights(self, value=1.0):
+                await asyncio.sleep(0)
+                return [value]*self.units
+
+            @tdl.pr(reqs=[weights], order=tdl.BUILD)
+            async def total(self):
+                return sum(self.weights)
+
+        model = ModelA()
+        with self.assertRaises(TypeError):
+            tdl.build(model, units=2)
+        model = ModelA()
+        asyncio.run(tdl.abuild(model, units=2, weights=2.0))
+        assert model.weights == [2.0, 2.0]
+        assert model.total == 4.0
+
+    def test_errors(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            async def test_a1(self):
+                raise ValueError("test_a1")
+
+            @tdl.pr(reqs=[test_a1])
+            async def test_a2(self):
+                return 2.0
+
+            @tdl.pr
+            async def test_a3(self):
+                raise KeyError("test_a3")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(tdl.acreate(ModelA))
+
+    def test_lazy_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, tdl_attrs; print('asyncio' in sys.modules); "
+             "tdl_attrs.acreate; print('asyncio' in sys.modules)"],
+            cwd=root, check=True, capture_output=True, text=True).stdout
+        assert output.split() == ["False", "True"]
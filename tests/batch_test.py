@@ -0,0 +1,69 @@
+import unittest
+import tdl_attrs as tdl
+
+
+class BatchTest(unittest.TestCase):
+    def test_construct_many(self):
+        batches = list()
+
+        @tdl.define
+        class Dense(object):
+            units = tdl.pr.required()
+            activation = tdl.pr.optional("relu")
+
+            @tdl.pr(reqs=[units])
+            def weights(self, value=1.0):
+                return [value]*self.units
+
+            @weights.batch
+            def weights(objs, calls):
+                batches.append(len(objs))
+                return [[kargs.get("value", 1.0)]*obj.units
+                        for obj, (args, kargs) in zip(objs, calls)]
+
+            @tdl.pr(reqs=[weights], order=tdl.BUILD)
+            def total(self, scale=1.0):
+                return scale*sum(self.weights)
+
+            def __init__(self, name=None):
+                self.name = name
+
+        configs = [{"units": 2}, {"units": 3, "weights": {"value": 2.0}},
+                   tdl.ar("dense", units=1, activation="tanh")]
+        models = tdl.construct_many(Dense, configs)
+        assert batches == [3]
+        assert [mi.weights for mi in models] == [
+            [1.0]*2, [2.0]*3, [1.0]]
+        assert models[2].name == "dense"
+        assert models[2].activation == "tanh"
+        expected = [Dense(**configs[0]), Dense(**configs[1]),
+                    Dense("dense", units=1, activation="tanh")]
+        for model, other in zip(models, expected):
+            assert tdl.get_input_args(model)[0] == \
+                tdl.get_input_args(other)[0]
+            assert model.weights == other.weights
+
+        tdl.build_many(models, total=2.0)
+        assert [mi.total for mi in models] == [4.0, 12.0, 2.0]
+        assert models[0].__tdl__.user_args.graph["total"] is not \
+            models[1].__tdl__.user_args.graph["total"]
+        assert tdl.construct_many(Dense, []) == []
+
+    def test_mixed_build(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr(order=tdl.BUILD)
+            def value(self, value=1):
+                return value
+
+        @tdl.define
+        class ModelB(ModelA):
+            @tdl.pr(reqs=[ModelA.value], order=tdl.BUILD)
+            def double(self):
+                return 2*self.value
+
+        models = [ModelA(), ModelB(), ModelA()]
+        tdl.build(models[2])
+        tdl.build_many(models, value=3)
+        assert [mi.value for mi in models] == [3, 3, 1]
+        assert models[1].double == 6
@@ -0,0 +1,88 @@
+import unittest
+import tdl_attrs as tdl
+
+
+class CacheTest(unittest.TestCase):
+    def test_cache(self):
+        calls = list()
+
+        for codegen in (False, True):
+            cache = tdl.InitCache(maxsize=2)
+
+            @tdl.define(codegen=codegen)
+            class ModelA(object):
+                units = tdl.pr.required()
+
+                @tdl.pr(reqs=[units], cache=cache)
+                def table(self, method="zeros"):
+                    calls.append((self.units, method))
+                    return [0.0 if method == "zeros" else 1.0]*self.units
+
+            del calls[:]
+            model1 = ModelA(units=3)
+            model2 = ModelA(units=3)
+            assert calls == [(3, "zeros")]
+            assert model1.table == model2.table == [0.0]*3
+            # values are copied unless the cache is immutable
+            assert model1.table is not model2.table
+            ModelA(units=3, table="ones")
+            ModelA(units=4, table={"method": "ones"})
+            assert len(calls) == 3
+            info = cache.cache_info()
+            assert (info.hits, info.misses, info.evictions) == (1, 3, 1)
+            assert info.currsize == 2
+            ModelA(units=3)
+            assert len(calls) == 4
+            cache.cache_clear()
+            assert cache.cache_info().currsize == 0
+
+    def test_immutable(self):
+        @tdl.define
+        class ModelA(object):
+            units = tdl.pr.required()
+
+            @tdl.pr(reqs=[units], cache=tdl.InitCache(immutable=True))
+            def table(self):
+                return tuple(range(self.units))
+
+            @tdl.pr(cache=True)
+            def other(self, value=None):
+                return [value]
+
+        model1 = ModelA(units=3, other=[1, 2])
+        model2 = ModelA(units=3, other=[1, 2])
+        assert model1.table is model2.table
+        assert ModelA.table.cache.cache_info().hits == 1
+        assert ModelA.other.cache.cache_info().hits == 1
+        assert model1.other == model2.other == [[1, 2]]
+        assert model1.other is not model2.other
+
+    def test_unhashable(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr(cache=True)
+            def test_a1(self, value=None):
+                return value
+
+        class Unhashable(object):
+            __hash__ = None
+
+        ModelA(test_a1=Unhashable())
+        ModelA(test_a1=Unhashable())
+        info = ModelA.test_a1.cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (0, 2, 0)
+
+    def test_maxbytes(self):
+        cache = tdl.InitCache(maxsize=None, maxbytes=100,
+                              getsizeof=lambda value: 40)
+
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr(cache=cache)
+            def test_a1(self, value=0):
+                return value
+
+        for value in range(4):
+            ModelA(test_a1=value)
+        info = cache.cache_info()
+        assert (info.currsize, info.nbytes, info.evictions) == (2, 80, 2)
@@ -0,0 +1,139 @@
+import unittest
+import tdl_attrs as tdl
+
+
+def make_models(codegen):
+    @tdl.define(codegen=codegen)
+    class ModelA(object):
+        test_a1 = tdl.pr.required()
+        test_a2 = tdl.pr.optional(2.0)
+
+        @tdl.pr(reqs=[test_a1, test_a2], order=tdl.INIT)
+        def test_a3(self, value):
+            return value*self.test_a1*self.test_a2
+
+        @tdl.pr(reqs=[test_a1, test_a2], order=tdl.BUILD)
+        def test_a4(self, value):
+            return value*self.test_a1*self.test_a2
+
+        @tdl.pr(reqs=[test_a1, test_a4], order=tdl.BUILD)
+        def test_a5(self, value, bias):
+            return value*self.test_a1*self.test_a4 + bias
+
+        def __init__(self, value, kvalue=None):
+            self.value = value
+            self.kvalue = kvalue
+
+    @tdl.define(codegen=codegen)
+    class ModelB(ModelA):
+        test_b1 = tdl.pr.required(order=tdl.MANUAL)
+
+        @tdl.pr(reqs=[test_b1, ModelA.test_a5], order=tdl.BUILD)
+        def test_b2(self, value=1.0):
+            return value*self.test_b1*self.test_a5
+
+    return ModelA, ModelB
+
+
+class CodegenTest(unittest.TestCase):
+    def test_generated(self):
+        ModelA, ModelB = make_models(codegen=True)
+        assert "test_a3=" in ModelA.__init__.__tdl_source__
+        assert ModelA.__TDL__.build is not None
+        assert ModelB.__init__ is not ModelA.__init__
+
+    def test_equivalence(self):
+        def run(ModelA, ModelB):
+            model_a = ModelA("value", kvalue="kvalue",
+                             test_a1=tdl.ar(1.0), test_a3=3.0,
+                             test_a5={'bias': 1.0})
+            assert tdl.is_initialized(model_a, "test_a3")
+            assert not tdl.is_initialized(model_a, "test_a4")
+            tdl.build(model_a, test_a4=4.0, test_a5=tdl.ar(value=5.0))
+            model_b = ModelB("value", test_a1=1.0, test_a3=tdl.ar(value=3.0))
+            model_b.test_b1.init(2.0)
+            tdl.build(model_b, test_a4=4.0, test_a5={"value": 5.0,
+                                                      "bias": 1.5})
+            return [
+                (model.value, model.kvalue, model.test_a1, model.test_a2,
+                 model.test_a3, model.test_a4, model.test_a5,
+                 tdl.get_input_args(model)[0],
+                 {ki: repr(vi)
+                  for ki, vi in tdl.get_input_args(model)[1].items()})
+                for model in (model_a, model_b)] + [model_b.test_b2]
+
+        assert run(*make_models(codegen=True)) == \
+            run(*make_models(codegen=False))
+
+    def test_requirements(self):
+        ModelA, ModelB = make_models(codegen=True)
+        model_b = ModelB("value", test_a1=1.0, test_a3=3.0)
+        with self.assertRaises(AssertionError):
+            tdl.build(model_b, test_a4=4.0, test_a5={"value": 5.0,
+                                                      "bias": 1.5})
+
+    def test_inheritance(self):
+        @tdl.define(codegen=True)
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            def __init__(self):
+                self.init_a1 = "a1"
+
+        @tdl.define(codegen=True)
+        class ModelC(object):
+            @tdl.pr
+            def test_c1(self, var):
+                return var
+
+            def __init__(self):
+                self.init_c1 = "c1"
+
+        @tdl.define(codegen=True)
+        class ModelD(ModelA, ModelC):
+            @tdl.pr(reqs=[ModelC.test_c1])
+            def test_a1(self, var):
+                return var*self.test_c1
+
+            def __init__(self):
+                super(ModelA, self).__init__()
+                self.init_d1 = 'd1'
+
+        model = ModelD(test_a1=4.0, test_c1=2.0)
+        assert model.test_a1 == 8.0
+        assert model.init_c1 == "c1" and model.init_d1 == "d1"
+        assert not hasattr(model, "init_a1")
+
+        # subclasses that are not generated use the generic path
+        @tdl.define
+        class ModelE(ModelA):
+            test_e1 = tdl.pr.optional(1.0)
+
+        model = ModelE(test_a1=2.0)
+        assert model.test_a1 == 2.0 and model.test_e1 == 1.0
+        assert model.init_a1 == "a1"
+
+        class ModelF(ModelA):
+            pass
+
+        model = ModelF(test_a1=3.0)
+        assert model.test_a1 == 3.0 and model.init_a1 == "a1"
+        assert tdl.get_input_args(model)[1]["test_a1"].args == (3.0,)
+
+    def test_setter(self):
+        @tdl.define(codegen=True)
+        class ModelA(object):
+            @tdl.pr(allow_set=True)
+            def test_a1(self, value=1.0):
+                return value
+
+            @tdl.pr(reqs=[test_a1])
+            def test_a2(self, value=2.0):
+                return value*self.test_a1
+
+            def __init__(self, value):
+                self.test_a1 = value
+
+        model = ModelA(3.0, test_a1=5.0)
+        assert model.test_a1 == 3.0
+        assert model.test_a2 == 6.0
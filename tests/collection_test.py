@@ -0,0 +1,156 @@
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import unittest
+import tdl_attrs as tdl
+
+
+@tdl.define
+class Dense(object):
+    activation = tdl.pr.optional(None)
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def bias(self, value=0.0):
+        return [value]*self.units
+
+    @tdl.pr(reqs=[weights], order=tdl.LAZY)
+    def norm(self):
+        return sum(wi*wi for wi in self.weights)
+
+    def __call__(self, value):
+        return sum(vi*wi + bi for vi, wi, bi
+                   in zip(value, self.weights, self.bias))
+
+
+@tdl.define
+class ReadmeDense(object):
+    """Dense of the README."""
+    activation = tdl.pr.optional(None)
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    def _init_vec(self, units, method):
+        assert method in ("zeros", "random")
+        if method == "zeros":
+            return [0]*units
+        elif method == "random":
+            return [random.random() for _ in range(units)]
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def weights(self, method="random"):
+        return self._init_vec(self.units, method)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def bias(self, method="zeros"):
+        return self._init_vec(self.units, method)
+
+    def __call__(self, value):
+        if not tdl.is_initialized(self, "units"):
+            tdl.build(self, units=len(value))
+        output = sum(
+            [vi*wi + bi for vi, wi, bi
+             in zip(value, self.weights, self.bias)]
+             )
+        if self.activation is None:
+            return output
+        elif self.activation == "relu":
+            return 0 if output < 0 else output
+
+
+class CollectionTest(unittest.TestCase):
+    def test_rows(self):
+        dense = tdl.Collection(
+            Dense, configs=[{"activation": "relu"}, {}, {}])
+        assert len(dense) == 3
+        assert list(dense.activation) == ["relu", None, None]
+        row = dense[0]
+        assert isinstance(row, Dense)
+        assert tdl.is_initialized(row, "activation")
+        assert not tdl.is_initialized(row, "weights")
+        with self.assertRaises(AttributeError):
+            dense.weights
+        dense.build(units=2, weights={"value": 2.0})
+        assert tdl.is_initialized(dense[-1], "weights")
+        assert list(dense[1].weights) == [2.0, 2.0]
+        assert dense[2]([1, 1]) == 4.0
+        assert not dense.is_initialized("norm")
+        assert dense[1].norm == 8.0
+        assert dense.is_initialized("norm")
+        with self.assertRaises(AttributeError):
+            dense[0].units = 3
+        with self.assertRaises(IndexError):
+            dense[3]
+        with self.assertRaises(TypeError):
+            tdl.Collection(Dense, 2, other=1)
+
+    def test_readme(self):
+        dense = tdl.Collection(ReadmeDense, configs=[
+            {"activation": "relu", "bias": {"method": "random"}},
+            {"weights": {"method": "zeros"}}, {}])
+        assert tdl.is_initialized(dense, "activation")
+        assert not tdl.is_initialized(dense, "units")
+        # the first call builds the whole collection
+        outputs = [row([1, 2, 3, 4]) for row in dense]
+        assert tdl.is_initialized(dense, "units")
+        assert list(dense.units) == [4, 4, 4]
+        assert outputs[0] > 0 and outputs[1] == 0
+        assert outputs[2] == sum(
+            (i + 1)*wi for i, wi in enumerate(dense[2].weights))
+        assert list(dense[1].weights) == [0]*4
+        with self.assertRaises(TypeError):
+            tdl.build(dense[0], targets=["weights"])
+
+        dense = tdl.Collection(ReadmeDense, 2)
+        tdl.build(dense, units=3)
+        assert tdl.is_initialized(dense[1], "weights")
+        assert len(dense[1].weights) == 3
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None,
+                     "numpy not installed")
+    def test_vectorized(self):
+        import numpy as np
+        calls = list()
+
+        @tdl.define
+        class Model(object):
+            units = tdl.pr.required()
+
+            @tdl.pr(reqs=[units])
+            def scale(self, value=1.0):
+                return value*self.units
+
+            @scale.vectorized
+            def scale(self, calls_):
+                calls.append(len(calls_))
+                values = np.array([kargs.get("value", 1.0)
+                                   for _, kargs in calls_])
+                return values*self.units
+
+            @tdl.pr(reqs=[units])
+            def ragged(self):
+                return list(range(self.units))
+
+        models = tdl.Collection(
+            Model, configs=[{"units": i, "scale": {"value": 0.5*i}}
+                            for i in range(1, 5)])
+        assert calls == [4]
+        assert isinstance(models.units, np.ndarray)
+        np.testing.assert_allclose(models.scale, [0.5, 2.0, 4.5, 8.0])
+        assert isinstance(models.ragged, list)
+        assert models[2].ragged == [0, 1, 2]
+        assert models[3].scale == 8.0
+
+    def test_lazy_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, tdl_attrs; print('numpy' in sys.modules); "
+             "print(tdl_attrs.Collection.__name__)"],
+            cwd=root, check=True, capture_output=True, text=True).stdout
+        assert output.split() == ["False", "Collection"]
@@ -367,3 +367,449 @@ class CoreTest(unittest.TestCase):
         assert dense.activation is None
         assert dense([1, 2, 3, 4]) == 0
         assert all(wi == 0 for wi in dense.weights)
+
+    def test_plans(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+            test_a2 = tdl.pr.required(order=tdl.BUILD)
+
+            @tdl.pr(reqs=[test_a1, test_a2], order=tdl.BUILD)
+            def test_a3(self, value):
+                return value*self.test_a1*self.test_a2
+
+        @tdl.define
+        class ModelB(ModelA):
+            @tdl.pr(reqs=[ModelA.test_a3], order=tdl.BUILD)
+            def test_b1(self, value):
+                return value*self.test_a3
+
+            test_b2 = tdl.pr.required(order=tdl.MANUAL)
+
+        def names(cls, order):
+            return [desc.name for desc in cls.__TDL__.plans[order]]
+
+        assert names(ModelA, tdl.INIT) == ["test_a1"]
+        assert names(ModelA, tdl.BUILD) == ["test_a2", "test_a3"]
+        assert names(ModelA, tdl.MANUAL) == []
+        assert names(ModelB, tdl.BUILD) == ["test_a2", "test_a3", "test_b1"]
+        assert names(ModelB, tdl.MANUAL) == ["test_b2"]
+
+        # re-defining a class recomputes its plans
+        @tdl.pr(reqs=[ModelB.test_b1], order=tdl.BUILD)
+        def test_b3(self, value):
+            return value*self.test_b1
+        test_b3.update_name("test_b3")
+        ModelB.test_b3 = test_b3
+        tdl.define(ModelB)
+        assert names(ModelB, tdl.BUILD) == [
+            "test_a2", "test_a3", "test_b1", "test_b3"]
+        assert names(ModelA, tdl.BUILD) == ["test_a2", "test_a3"]
+
+        model = ModelB(test_a1=1.0)
+        tdl.build(model, test_a2=2.0, test_a3=3.0, test_b1=4.0, test_b3=5.0)
+        assert model.test_b3 == 5.0*4.0*3.0*1.0*2.0
+
+    def test_state(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1], order=tdl.BUILD)
+            def test_a2(self, value):
+                """test_a2 docstring"""
+                return value*self.test_a1
+
+        created = list()
+        initializer_init = tdl.pr.Initializer.__init__
+
+        def counted_init(self, obj, desc):
+            created.append(desc.name)
+            initializer_init(self, obj, desc)
+
+        tdl.pr.Initializer.__init__ = counted_init
+        try:
+            model = ModelA(test_a1=2.0)
+            assert not tdl.is_initialized(model, "test_a2")
+            tdl.build(model, test_a2=3.0)
+            assert tdl.is_initialized(model, "test_a2")
+            assert created == []
+            model = ModelA(test_a1=2.0)
+            assert model.test_a2.__doc__ == "test_a2 docstring"
+            model.test_a2.init(5.0)
+            assert created == ["test_a2", "test_a2"]
+        finally:
+            tdl.pr.Initializer.__init__ = initializer_init
+        assert tdl.is_initialized(model, "test_a2")
+        assert model.test_a2 == 10.0
+        bits = ModelA.__TDL__.bits
+        assert model.__tdl__.state == bits["test_a1"] | bits["test_a2"]
+
+    def test_lazy(self):
+        calls = list()
+
+        for codegen in (False, True):
+            @tdl.define(codegen=codegen)
+            class ModelA(object):
+                test_a1 = tdl.pr.required()
+
+                @tdl.pr(reqs=[test_a1], order=tdl.LAZY)
+                def test_a2(self, value=2.0):
+                    calls.append("test_a2")
+                    return value*self.test_a1
+
+                @tdl.pr(reqs=[test_a2], order=tdl.LAZY)
+                def test_a3(self, value=3.0):
+                    calls.append("test_a3")
+                    return value*self.test_a2
+
+                test_a4 = tdl.pr.required(order=tdl.BUILD)
+
+                @tdl.pr(reqs=[test_a4], order=tdl.LAZY)
+                def test_a5(self):
+                    return self.test_a4
+
+                @tdl.pr(reqs=[test_a3])
+                def test_a6(self, value=6.0):
+                    return value*self.test_a3
+
+            del calls[:]
+            model = ModelA(test_a1=1.0, test_a3={"value": 4.0})
+            assert calls == ["test_a2", "test_a3"]
+            assert model.test_a6 == 6.0*4.0*2.0
+
+            del calls[:]
+            model = ModelA(test_a1=1.0, test_a6=tdl.ar(1.0))
+            assert model.test_a6 == 3.0*2.0
+            model = ModelA(test_a1=1.0, test_a2=5.0)
+            assert tdl.is_initialized(model, "test_a2")
+
+            model = ModelA(test_a1=1.0)
+            with self.assertRaises(AssertionError):
+                model.test_a5
+            tdl.build(model, test_a4=4.0)
+            assert not tdl.is_initialized(model, "test_a5")
+            assert model.test_a5 == 4.0
+            assert tdl.is_initialized(model, "test_a5")
+
+    def test_lazy_build_args(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr(order=tdl.LAZY)
+            def test_a1(self, value=1.0):
+                return value
+
+        model = ModelA()
+        assert not tdl.is_initialized(model, "test_a1")
+        tdl.build(model, test_a1=3.0)
+        assert not tdl.is_initialized(model, "test_a1")
+        assert model.test_a1 == 3.0
+
+    def test_rebuild(self):
+        calls = list()
+        for codegen, slots in ((False, False), (True, False), (False, True)):
+            @tdl.define(codegen=codegen, slots=slots)
+            class ModelA(object):
+                units = tdl.pr.required()
+                scale = tdl.pr.optional(1.0)
+
+                @tdl.pr(reqs=[units, scale])
+                def weights(self, value=1.0):
+                    calls.append("weights")
+                    return [value*self.scale]*self.units
+
+                @tdl.pr(reqs=[weights], order=tdl.BUILD)
+                def total(self):
+                    calls.append("total")
+                    return sum(self.weights)
+
+                @tdl.pr(reqs=[weights], order=tdl.LAZY)
+                def first(self):
+                    return self.weights[0]
+
+                @tdl.pr(reqs=[units], order=tdl.MANUAL)
+                def extra(self, value):
+                    return value*self.units
+
+                @tdl.pr
+                def name(self, value="dense"):
+                    calls.append("name")
+                    return value
+
+            model = ModelA(units=2, weights={"value": 2.0})
+            tdl.build(model)
+            assert model.first == 2.0
+            model.extra.init(3)
+            del calls[:]
+            cleared = tdl.rebuild(model, units=4)
+            assert set(cleared) == {
+                "units", "weights", "total", "first", "extra"}
+            assert calls == ["weights", "total"]
+            assert model.weights == [2.0]*4 and model.total == 8.0
+            assert not tdl.is_initialized(model, "first")
+            assert not tdl.is_initialized(model, "extra")
+            assert model.first == 2.0
+            assert tdl.get_input_args(model)[1]["units"].args == (4,)
+
+            # the stored arguments of the dependents are reused
+            del calls[:]
+            tdl.rebuild(model, "scale")
+            assert calls == ["weights", "total"]
+            assert model.weights == [2.0]*4
+
+            assert tdl.invalidate(model, "total") == ("total",)
+            assert not tdl.is_initialized(model, "total")
+            assert tdl.is_initialized(model, "weights")
+            tdl.build(model)
+            assert model.total == 8.0
+            with self.assertRaises(AttributeError):
+                tdl.invalidate(model, "missing")
+
+            # attributes cleared by invalidate are computed by rebuild
+            tdl.invalidate(model, "units")
+            del calls[:]
+            assert tdl.rebuild(model, units=3) == ()
+            assert calls == ["weights"]
+            assert model.weights == [2.0]*3
+            assert not tdl.is_initialized(model, "total")
+            tdl.rebuild(model, "total")
+            assert model.total == 6.0
+
+            # the arguments of the caller are copied
+            args = tdl.ar(value=2.0)
+            tdl.rebuild(model, weights=args)
+            tdl.invalidate(model, "weights")
+            tdl.build(model, targets=["weights"], weights={"value": 3.0})
+            assert args.kargs == {"value": 2.0}
+            assert model.weights == [3.0]*3
+
+    def test_build_targets(self):
+        calls = list()
+
+        @tdl.define
+        class ModelA(object):
+            units = tdl.pr.required()
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def weights(self, value=1.0):
+                calls.append("weights")
+                return [value]*self.units
+
+            @tdl.pr(reqs=[weights], order=tdl.LAZY)
+            def norm(self):
+                calls.append("norm")
+                return sum(self.weights)
+
+            @tdl.pr(reqs=[norm], order=tdl.BUILD)
+            def output(self):
+                calls.append("output")
+                return self.norm
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def optimizer(self):
+                calls.append("optimizer")
+                return "sgd"
+
+            @tdl.pr(reqs=[weights], order=tdl.MANUAL)
+            def scaled(self, scale):
+                calls.append("scaled")
+                return [scale*wi for wi in self.weights]
+
+        model = ModelA(units=2)
+        assert tdl.plan(model, ["output"]) == ("weights", "norm", "output")
+        assert calls == []
+        tdl.build(model, targets=["output"], weights=2.0)
+        assert calls == ["weights", "norm", "output"]
+        assert model.output == 4.0
+        assert not tdl.is_initialized(model, "optimizer")
+        assert tdl.plan(model, ["output"]) == ()
+
+        with self.assertRaises(ValueError):
+            tdl.plan(model, ["scaled"])
+        assert tdl.plan(model, ["scaled"], scaled=3.0) == ("scaled",)
+        tdl.build(model, targets=["scaled"], scaled=3.0)
+        assert model.scaled == [6.0, 6.0]
+        with self.assertRaises(AttributeError):
+            tdl.plan(model, ["missing"])
+
+        # rebuild only computes the attributes that were initialized
+        del calls[:]
+        tdl.rebuild(model, units=3)
+        assert calls == ["weights", "norm", "output"]
+        assert model.output == 6.0
+        assert not tdl.is_initialized(model, "optimizer")
+
+        del calls[:]
+        tdl.build(model)
+        assert calls == ["optimizer"]
+
+    def test_strict(self):
+        for codegen in (False, True):
+            @tdl.define(strict=True, codegen=codegen)
+            class ModelA(object):
+                units = tdl.pr.required()
+
+                @tdl.pr(reqs=[units], order=tdl.LAZY)
+                def double(self):
+                    return 2*self.units
+
+                @tdl.pr(reqs=[double])
+                def weights(self, value=1.0):
+                    return [value]*self.double
+
+                @tdl.pr(reqs=[weights], order=tdl.BUILD)
+                def total(self):
+                    return sum(self.weights)
+
+            model = ModelA(units=2)
+            assert model.weights == [1.0]*4
+            tdl.build(model)
+            assert model.total == 4.0
+            assert ModelA.__TDL__.strict
+
+        class ModelB(object):
+            units = tdl.pr.required(order=tdl.BUILD)
+
+            @tdl.pr(order=tdl.MANUAL)
+            def scale(self, value):
+                return value
+
+            @tdl.pr(reqs=[units])
+            def weights(self, value=1.0):
+                return [value]*self.units
+
+            @tdl.pr(reqs=[scale], order=tdl.LAZY)
+            def factor(self):
+                return self.scale
+
+            @tdl.pr(reqs=[units, factor], order=tdl.BUILD)
+            def total(self):
+                return self.units*self.factor
+
+            @tdl.pr(reqs=[ModelA.double])
+            def other(self):
+                return self.double
+
+            def bad():
+                return 0
+
+            bad = tdl.pr(bad)
+
+            def __init__(self, weights=None):
+                pass
+
+        with self.assertRaises(tdl.DefinitionError) as error:
+            tdl.define(ModelB, strict=True)
+        errors = error.exception.errors
+        assert errors == [
+            "ModelB.weights is initialized at construction (INIT) but "
+            "requires units, which is initialized by tdl.build",
+            "ModelB.total (BUILD) requires factor, which is MANUAL or "
+            "depends on MANUAL attributes",
+            "ModelB.other requires double, which is not a tdl attribute of "
+            "ModelB",
+            "the finit of ModelB.bad does not accept the object as first "
+            "argument",
+            "the argument weights of ModelB.__init__ is a tdl attribute, "
+            "it is never passed to __init__",
+            ], errors
+        assert "ModelB.weights" in str(error.exception)
+        assert not hasattr(ModelB, "__TDL__")
+
+    def test_threadsafe(self):
+        import threading
+        import time
+        calls = list()
+
+        def slow(name, value):
+            calls.append(name)
+            time.sleep(0.01)
+            return value
+
+        @tdl.define(threadsafe=True)
+        class ModelA(object):
+            @tdl.pr
+            def units(self, value=2):
+                return value
+
+            @tdl.pr(reqs=[units], order=tdl.LAZY)
+            def scale(self, value=3):
+                return slow("scale", value)
+
+            @tdl.pr(reqs=[units, scale], order=tdl.BUILD)
+            def weights(self):
+                return slow("weights", [self.scale]*self.units)
+
+            @tdl.pr(order=tdl.MANUAL)
+            def bias(self, value):
+                return slow("bias", value)
+
+            @tdl.pr(order=tdl.MANUAL, allow_set=True)
+            def name(self, value):
+                return value
+
+        model = ModelA()
+        bias = model.bias
+        barrier = threading.Barrier(8, timeout=5)
+        errors = list()
+
+        def run(index):
+            barrier.wait()
+            tdl.build(model)
+            # the first call initializes bias, the others are skipped
+            bias.init(index)
+            try:
+                model.name = index
+            except AttributeError:
+                errors.append(index)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(calls) == ["bias", "scale", "weights"], calls
+        assert model.weights == [3, 3]
+        assert len(errors) == 7
+        assert model.name in range(8) and model.bias in range(8)
+        assert model.__tdl__.locks is not None
+
+        # concurrent builds with arguments
+        @tdl.define(threadsafe=True)
+        class ModelC(object):
+            units = tdl.pr.required(order=tdl.BUILD)
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def weights(self, value=0):
+                return slow("weights_c", [value]*self.units)
+
+        model = ModelC()
+        barrier = threading.Barrier(8, timeout=5)
+
+        def run_args():
+            barrier.wait()
+            try:
+                tdl.build(model, units=3, weights={"value": 1})
+            except Exception as error:
+                errors.append(error)
+
+        del errors[:]
+        threads = [threading.Thread(target=run_args) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+        assert model.weights == [1, 1, 1]
+        assert calls.count("weights_c") == 1
+
+        # objects of classes that are not threadsafe do not create locks
+        @tdl.define
+        class ModelB(object):
+            @tdl.pr
+            def units(self, value=2):
+                return value
+
+        model = ModelB()
+        tdl.build(model)
+        assert model.__tdl__.locks is None
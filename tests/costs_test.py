@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+import unittest
+import tdl_attrs as tdl
+
+
+def make_class(codegen=False):
+    @tdl.define(codegen=codegen)
+    class Model(object):
+        units = tdl.pr.required()
+
+        @tdl.pr(reqs=[units], order=tdl.BUILD)
+        def small(self):
+            return self.units
+
+        @tdl.pr(reqs=[units], order=tdl.BUILD, concurrent=True)
+        def large(self):
+            return 2*self.units
+
+        @tdl.pr(reqs=[large], order=tdl.BUILD, concurrent=True)
+        def head(self):
+            return self.large + 1
+
+        @tdl.pr(reqs=[small, head], order=tdl.BUILD)
+        def output(self):
+            return self.small + self.head
+    return Model
+
+
+def event(cls, attr, duration):
+    return tdl.InitEvent(cls, attr, tdl.BUILD, "build", 0.0, duration, "",
+                         0, None)
+
+
+def make_costs(cls):
+    costs = tdl.CostModel(alpha=0.5)
+    for attr, duration in [("units", 0.0), ("small", 1.0), ("large", 3.0),
+                           ("head", 2.0), ("output", 1.0)]:
+        costs(event(cls, attr, duration))
+    return costs
+
+
+class CostsTest(unittest.TestCase):
+    def test_model(self):
+        Model = make_class()
+        costs = tdl.CostModel(alpha=0.5)
+        with tdl.instrument(costs):
+            tdl.build(Model(units=3))
+        assert costs.estimate(Model, "output").count == 1
+        costs.clear()
+        costs(event(Model, "large", 2.0))
+        costs(event(Model, "large", 4.0))
+        costs(event(Model, "large", 10.0)._replace(error=ValueError()))
+        assert costs.estimate(Model, "large") == (2, 3.0, None)
+        assert costs.estimate(Model, "small") is None
+        assert costs.duration(Model, "small") == costs.default
+
+        # estimates of the base classes are used by the subclasses
+        @tdl.define
+        class Derived(Model):
+            pass
+        assert costs.duration(Derived, "large") == 3.0
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "costs.json")
+            costs.save(path)
+            loaded = tdl.CostModel().load(path)
+        assert loaded.estimates == costs.estimates
+
+    def test_schedule(self):
+        Model = make_class()
+        costs = make_costs(Model)
+        path, length = tdl.costs.critical_path(Model, costs=costs)
+        assert path == ("large", "head", "output") and length == 6.0
+        assert tdl.costs.path_lengths(Model, costs=costs) == {
+            "small": 2.0, "large": 6.0, "head": 3.0, "output": 1.0}
+        plan = tdl.costs.ordered_plan(Model, costs=costs)
+        assert [desc.name for desc in plan] == \
+            ["large", "head", "small", "output"]
+        # large starts once the calling thread has run small
+        assert tdl.costs.simulate(Model, costs=costs) == [
+            ("small", 0.0, 1.0), ("large", 1.0, 4.0), ("head", 4.0, 6.0),
+            ("output", 6.0, 7.0)]
+        tdl.costs.optimize(Model, costs)
+        assert tdl.costs.simulate(Model, costs=costs) == [
+            ("large", 0.0, 3.0), ("small", 0.0, 1.0), ("head", 3.0, 5.0),
+            ("output", 5.0, 6.0)]
+        assert tdl.costs.simulate(Model, costs=costs, parallel=False)[-1] \
+            == ("output", 6.0, 7.0)
+        output = io.StringIO()
+        tdl.explain(Model, costs=costs, file=output)
+        lines = output.getvalue().splitlines()
+        assert lines[2].startswith("large") and \
+            lines[2].endswith("(concurrent, critical)")
+        assert lines[-2].startswith("critical path: large -> head -> output")
+        assert lines[-1] == "estimated total: 6000.000 ms"
+
+    def test_optimize(self):
+        for codegen in (False, True):
+            Model = make_class(codegen)
+            tdl.costs.optimize(Model, make_costs(Model))
+            assert [desc.name for desc in Model.__TDL__.plans[tdl.BUILD]] \
+                == ["large", "head", "small", "output"]
+            if codegen:
+                assert "large" in Model.__TDL__.build.__tdl_source__
+            model = Model(units=3)
+            tdl.build(model)
+            assert model.output == 10
@@ -0,0 +1,94 @@
+import gc
+import pickle
+import unittest
+import tdl_attrs as tdl
+
+manager = tdl.MemoryManager(budget=100, getsizeof=lambda value: 40)
+
+
+@tdl.define
+class Model(object):
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD, evictable=manager)
+    def table(self, scale=1):
+        return [scale*i for i in range(self.units)]
+
+    @tdl.pr(reqs=[table], order=tdl.BUILD, evictable=manager)
+    def total(self):
+        return sum(self.table)
+
+
+@tdl.define
+class Given(object):
+    @tdl.pr(order=tdl.MANUAL, evictable=manager)
+    def table(self, scale=1):
+        return [scale]*3
+
+    @tdl.pr(order=tdl.BUILD, evictable=manager, allow_set=True)
+    def other(self, value=1):
+        return [value]*3
+
+
+class EvictTest(unittest.TestCase):
+    def setUp(self):
+        manager.evict(0)
+        manager.evictions = manager.rematerializations = 0
+
+    def test_evict(self):
+        model = Model()
+        tdl.build(model, units=3, table={"scale": 2})
+        assert manager.info() == tdl.EvictionInfo(0, 0, 100, 2, 80)
+        other = Model()
+        tdl.build(other, units=2)
+        # the least recently used values are evicted
+        assert manager.info().evictions == 2
+        assert not hasattr(model, "__tdl__table")
+        assert tdl.is_initialized(model, "table")
+        # evicted values are computed again from the user arguments
+        assert model.total == 6
+        assert model.table == [0, 2, 4]
+        info = manager.info()
+        assert info.rematerializations == 2
+        assert info.nbytes <= 100 and info.currsize == 2
+        assert not hasattr(other, "__tdl__table")
+        # reads update the order of the values
+        model.total
+        assert other.table == [0, 1]
+        assert hasattr(model, "__tdl__total")
+        assert not hasattr(model, "__tdl__table")
+
+        copy = pickle.loads(pickle.dumps(model))
+        assert copy.table == [0, 2, 4]
+        tdl.invalidate(model, "table")
+        assert not tdl.is_initialized(model, "total")
+        del model, other, copy
+        gc.collect()
+        assert manager.info().currsize == 0
+
+    def test_evictable(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr(evictable=True)
+            def test_a1(self, value=1):
+                return [value]
+
+        assert isinstance(ModelA.test_a1, tdl.evict.EvictableDescriptor)
+        assert ModelA.test_a1.evictable is tdl.evict.manager
+        model = ModelA(test_a1=2)
+        tdl.evict.manager.evict(0)
+        assert model.test_a1 == [2]
+        assert not isinstance(Model.units, tdl.evict.EvictableDescriptor)
+
+    def test_user_values(self):
+        model = Given()
+        model.table.init(scale=5)
+        model.other = [9, 9, 9]
+        # values that are not computed from the user arguments are kept
+        assert manager.info().currsize == 0
+        manager.evict(0)
+        assert model.table == [5, 5, 5] and model.other == [9, 9, 9]
+        copy = pickle.loads(pickle.dumps(model))
+        manager.evict(0)
+        assert copy.table == [5, 5, 5] and copy.other == [9, 9, 9]
+        assert manager.info().evictions == 0
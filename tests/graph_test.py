@@ -0,0 +1,137 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+import tdl_attrs as tdl
+from tdl_attrs.graph import DiGraph
+
+
+class GraphTest(unittest.TestCase):
+    def test_topological_sort(self):
+        graph = DiGraph()
+        for ni in ["a", "b", "c", "d"]:
+            graph.add_node(ni)
+        graph.add_edge("c", "b")
+        graph.add_edge("b", "a")
+        graph.add_edge("d", "a")
+        order = graph.topological_sort()
+        assert order == ["c", "d", "b", "a"]
+        assert graph.find_cycle() is None
+        assert list(graph.predecessors("a")) == ["b", "d"]
+        assert list(graph.successors("c")) == ["b"]
+        assert graph.descendants("c") == {"b", "a"}
+        assert graph.descendants("a") == set()
+
+    def test_cycle(self):
+        graph = DiGraph()
+        graph.add_edge("a", "b")
+        graph.add_edge("b", "c")
+        graph.add_edge("c", "a")
+        graph.add_edge("c", "d")
+        assert graph.find_cycle() == ["a", "b", "c", "a"]
+        with self.assertRaises(tdl.CycleError) as error:
+            graph.topological_sort()
+        assert error.exception.cycle == ["a", "b", "c", "a"]
+
+    def test_define_cycle(self):
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1])
+            def test_a2(self, value):
+                return value
+
+        ModelA.test_a1.reqs.append(ModelA.test_a2)
+        with self.assertRaises(tdl.CycleError) as error:
+            tdl.define(ModelA)
+        assert error.exception.cycle == ["test_a1", "test_a2", "test_a1"]
+        assert "test_a1 -> test_a2 -> test_a1" in str(error.exception)
+
+    def test_incremental(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1])
+            def test_a2(self, value=1):
+                return value*self.test_a1
+
+        @tdl.define
+        class ModelB(ModelA):
+            @tdl.pr(reqs=[ModelA.test_a2])
+            def test_b1(self, value=2):
+                return value*self.test_a2
+
+        @tdl.define
+        class ModelC(ModelA):
+            @tdl.pr
+            def test_a1(self, value=3):
+                return value
+
+        @tdl.define
+        class ModelD(ModelB, ModelC):
+            pass
+
+        for model in (ModelB, ModelC, ModelD):
+            graph = model.__TDL__.graph
+            full = DiGraph()
+            for ci in model.__mro__[::-1]:
+                for ni, vi in ci.__dict__.items():
+                    if isinstance(vi, tdl.TdlDescriptor):
+                        full.add_node(ni, desc=vi)
+            for ni in full:
+                for ri in full.nodes[ni]["desc"].reqs:
+                    full.add_edge(ri.name, ni)
+            assert list(graph) == list(full)
+            assert set(graph.edges) == set(full.edges)
+            assert all(graph.nodes[ni]["desc"] is full.nodes[ni]["desc"]
+                       for ni in graph)
+        assert ModelB.__TDL__.graph is not ModelA.__TDL__.graph
+        assert [di.name for di in ModelB.__TDL__.plans[tdl.INIT]] == [
+            "test_a1", "test_a2", "test_b1"]
+        assert ModelB.__TDL__.bits["test_a2"] == ModelA.__TDL__.bits["test_a2"]
+        assert ModelD(test_a1=2).test_b1 == 2*2
+        assert ModelD().test_b1 == 2*3
+
+        class ModelE(ModelA):
+            @tdl.pr(reqs=[ModelA.test_a2])
+            def test_a1(self, value=3):
+                return value
+
+        with self.assertRaises(tdl.CycleError):
+            tdl.define(ModelE)
+
+    def test_lazy_doc(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            def test_a1(self, value=1):
+                return value
+
+        assert ModelA.test_a1._doc is None
+        assert "value" in ModelA.test_a1.__doc__
+
+    def test_no_networkx(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, tdl_attrs; print('networkx' in sys.modules)"],
+            cwd=root, check=True, capture_output=True, text=True).stdout
+        assert output.strip() == "False"
+
+    @unittest.skipIf(importlib.util.find_spec("networkx") is None,
+                     "networkx not installed")
+    def test_to_networkx(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1])
+            def test_a2(self, value):
+                return value
+
+        graph = ModelA.__TDL__.graph.to_networkx()
+        assert set(graph.nodes) == {"test_a1", "test_a2"}
+        assert list(graph.edges) == [("test_a1", "test_a2")]
+        assert graph.nodes["test_a2"]["desc"] is ModelA.test_a2
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import tdl_attrs as tdl
+
+
+class InstrumentTest(unittest.TestCase):
+    def test_events(self):
+        for codegen in (False, True):
+            @tdl.define(codegen=codegen)
+            class ModelA(object):
+                units = tdl.pr.required()
+
+                @tdl.pr(reqs=[units])
+                def weights(self, scale=1.0):
+                    return [scale]*self.units
+
+                @tdl.pr(reqs=[weights], order=tdl.BUILD)
+                def total(self):
+                    return sum(self.weights)
+
+                @tdl.pr(reqs=[total], order=tdl.LAZY)
+                def mean(self):
+                    return self.total/self.units
+
+                @tdl.pr(order=tdl.MANUAL)
+                def extra(self, value):
+                    return value
+
+            events = list()
+            with tdl.instrument(events.append):
+                model = ModelA(units=2, weights={"scale": 2.0})
+                tdl.build(model)
+                assert model.mean == 2.0
+                model.extra.init(5)
+            assert [(ei.attr, ei.caller) for ei in events] == [
+                ("units", "__init__"), ("weights", "__init__"),
+                ("total", "build"), ("mean", "lazy"), ("extra", "init")]
+            assert events[1].order is tdl.INIT
+            assert events[1].args == "scale=2.0"
+            assert all(ei.cls is ModelA and ei.duration >= 0
+                       and ei.error is None for ei in events)
+            # callbacks are not called once removed
+            del events[:]
+            ModelA(units=2)
+            assert events == []
+
+    def test_error(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            def value(self):
+                raise RuntimeError("failed")
+
+        events = list()
+        hook = tdl.instrument(events.append)
+        with self.assertRaises(RuntimeError):
+            ModelA()
+        hook.remove()
+        assert len(events) == 1
+        assert isinstance(events[0].error, RuntimeError)
+
+    def test_async(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            async def value(self):
+                return 1
+
+            @tdl.pr(reqs=[value])
+            def double(self):
+                return 2*self.value
+
+        events = list()
+        with tdl.instrument(events.append):
+            model = asyncio.run(tdl.acreate(ModelA))
+        assert model.double == 2
+        assert sorted((ei.attr, ei.caller) for ei in events) == [
+            ("double", "acreate"), ("value", "acreate")]
+
+    def test_stats_and_trace(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            def value(self):
+                return 1
+
+        stats = tdl.InitStats()
+        trace = tdl.ChromeTrace()
+        with tdl.instrument(stats), tdl.instrument(trace):
+            for _ in range(3):
+                ModelA()
+        (key, entry), = stats.entries.items()
+        assert key[1] == "value" and entry.count == 3
+        assert entry.min <= entry.max <= entry.total
+        assert list(stats.by_class().values()) == [(3, entry.total)]
+        assert "ModelA.value" in stats.report()
+        with tempfile.TemporaryDirectory() as path:
+            filename = os.path.join(path, "trace.json")
+            trace.dump(filename)
+            with open(filename) as file:
+                data = json.load(file)
+        assert len(data["traceEvents"]) == 3
+        event = data["traceEvents"][0]
+        assert event["ph"] == "X" and event["name"].endswith("ModelA.value")
+        assert event["cat"] == "__init__"
@@ -0,0 +1,81 @@
+import gc
+import unittest
+import tdl_attrs as tdl
+
+
+@tdl.define
+class Dense(object):
+    units = tdl.pr.required()
+
+    @tdl.pr(reqs=[units])
+    def weights(self, value=1.0):
+        return [float(value + i) for i in range(self.units)]
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def bias(self):
+        return bytearray(1000*self.units)
+
+
+def _name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class MemoryTest(unittest.TestCase):
+    def test_report(self):
+        tdl.memory.track(Dense)
+        try:
+            models = [Dense(units=100) for _ in range(4)]
+            assert len(tdl.memory.instances(Dense)) == 4
+            tdl.build(models[0])
+            report = tdl.memory_report(Dense)
+            name = f"{__name__}.Dense"
+            weights = report.entries[(name, "weights")]
+            assert weights.count == 4
+            assert weights.nbytes > 4*100*24
+            bias = report.entries[(name, "bias")]
+            assert bias.count == 1 and bias.nbytes >= 100*1000
+            assert report.entries[(name, tdl.memory.USER_ARGS)].count == 4
+            assert report.entries[(name, tdl.memory.TDLOBJ)].count == 4
+            assert report.by_class() == {name: report.nbytes}
+            lines = report.report().splitlines()
+            assert lines[1].startswith(f"{name}.bias")
+            # values shared by the instances are counted once
+            one = tdl.memory_report(models[1]).entries[(name, "units")]
+            assert report.entries[(name, "units")].nbytes == one.nbytes
+            del models
+            gc.collect()
+            assert tdl.memory.instances(Dense) == []
+        finally:
+            tdl.memory.untrack(Dense)
+        # instances of classes that are not tracked are found by the gc
+        model = Dense(units=1)
+        report = tdl.memory_report(Dense)
+        assert report.entries[(f"{__name__}.Dense", "weights")].count == 1
+        del model
+
+        # the arguments kept by the objects are measured
+        @tdl.define
+        class Table(object):
+            @tdl.pr(order=tdl.BUILD)
+            def table(self, values):
+                return values
+
+        model = Table(table=list(range(100000)))
+        report = tdl.memory_report(model)
+        entry = report.entries[(_name(Table), tdl.memory.USER_ARGS)]
+        assert entry.nbytes > 100000*28
+
+    def test_trace_allocations(self):
+        with tdl.memory.trace_allocations() as stats:
+            model = Dense(units=1000)
+            tdl.build(model)
+        entries = {attr: entry for (_, attr), entry in stats.entries.items()}
+        assert entries["bias"].nbytes >= 1000*1000
+        assert entries["weights"].nbytes >= 1000*24
+        assert entries["weights"].count == 1
+        assert "weights" in stats.report()
+        assert tdl.memory.instrument.memory_tracers == []
+        events = list()
+        with tdl.instrument(events.append):
+            Dense(units=1)
+        assert all(ei.memory is None for ei in events)
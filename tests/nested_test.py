@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import unittest
+import concurrent.futures
+import tdl_attrs as tdl
+
+
+@tdl.define
+class Dense(object):
+    activation = tdl.pr.optional(None)
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+
+@tdl.define
+class Pair(object):
+    @tdl.pr(component=True)
+    def encoder(self):
+        return Dense()
+
+    @tdl.pr(reqs=[encoder], order=tdl.BUILD)
+    def size(self):
+        return self.encoder.units
+
+    @tdl.pr(reqs=[size], order=tdl.BUILD, component=True)
+    def decoder(self):
+        return Dense()
+
+
+class NestedTest(unittest.TestCase):
+    def test_build(self):
+        built = list()
+
+        @tdl.define
+        class Block(object):
+            @tdl.pr(component=True)
+            def dense(self):
+                return Dense()
+
+            @tdl.pr(reqs=[dense], order=tdl.BUILD)
+            def size(self):
+                built.append("block")
+                return self.dense.units
+
+        @tdl.define
+        class Model(object):
+            @tdl.pr(component=True)
+            def encoder(self, activation=None):
+                return Dense(activation=activation)
+
+            @tdl.pr(component=True)
+            def block(self):
+                return Block()
+
+            @tdl.pr(reqs=[encoder, block], order=tdl.BUILD)
+            def size(self, extra=0):
+                built.append("model")
+                return self.encoder.units + self.block.size + extra
+
+            @tdl.pr(reqs=[size], order=tdl.BUILD, component=True)
+            def decoder(self):
+                return Dense()
+
+        model = Model(encoder={"activation": "relu"})
+        assert not tdl.is_initialized(model.encoder, "units")
+        tdl.build(model, encoder={"units": 3, "weights": {"value": 2.0}},
+                  block={"dense": {"units": 2}}, size={"extra": 1},
+                  decoder={"units": 1})
+        assert model.encoder.activation == "relu"
+        assert model.encoder.weights == [2.0]*3
+        assert model.block.dense.weights == [1.0]*2
+        assert built == ["block", "model"]
+        assert model.size == 6
+        # BUILD components are built when they are initialized
+        assert model.decoder.weights == [1.0]
+        # built subtrees are skipped
+        tdl.build(model)
+        assert built == ["block", "model"]
+
+        with self.assertRaises(TypeError):
+            tdl.build(Model(), encoder=3)
+
+        @tdl.define
+        class Manual(object):
+            @tdl.pr(order=tdl.MANUAL, component=True)
+            def dense(self):
+                return Dense()
+
+        model = Manual()
+        tdl.build(model)
+        with self.assertRaises(ValueError):
+            tdl.build(model, dense={"units": 1})
+        model.dense.init()
+        tdl.build(model, dense={"units": 1})
+        assert model.dense.weights == [1.0]
+
+    def test_shared(self):
+        @tdl.define
+        class Model(object):
+            shared = tdl.pr.required()
+
+            @tdl.pr(reqs=[shared], component=True)
+            def left(self):
+                return self.shared
+
+            @tdl.pr(reqs=[shared], component=True)
+            def right(self):
+                return self.shared
+
+        dense = Dense()
+        model = Model(shared=dense)
+        tdl.build(model, left={"units": 2})
+        assert dense.weights == [1.0]*2
+
+    def test_executor(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        @tdl.define
+        class Branch(object):
+            @tdl.pr(order=tdl.BUILD, concurrent=True)
+            def value(self, value):
+                barrier.wait()
+                return value
+
+        @tdl.define
+        class Model(object):
+            @tdl.pr(component=True)
+            def left(self):
+                return Branch()
+
+            @tdl.pr(component=True)
+            def right(self):
+                return Branch()
+
+            @tdl.pr(reqs=[left, right], order=tdl.BUILD)
+            def total(self):
+                return self.left.value + self.right.value
+
+        model = Model()
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            # both branches wait on the barrier, so they run together
+            tdl.build(model, executor=executor,
+                      left={"value": 1}, right={"value": 2})
+        assert model.total == 3
+
+    def test_parallel_build(self):
+        models = [Pair() for _ in range(3)]
+        tdl.parallel_build(models, processes=2, encoder={"units": 4},
+                           decoder={"units": 2})
+        for model in models:
+            assert model.size == 4
+            assert model.encoder.weights == [1.0]*4
+            assert model.decoder.weights == [1.0]*2
+            kargs = tdl.get_input_args(model)[1]
+            assert "encoder" not in kargs and "decoder" not in kargs
+            kargs = tdl.get_input_args(model.encoder)[1]
+            assert kargs["units"].args == (4,)
+
+    def test_build_many(self):
+        models = [Pair() for _ in range(3)]
+        tdl.build_many(models, encoder={"units": 4}, decoder={"units": 2})
+        for model in models:
+            assert model.size == 4
+            assert model.decoder.weights == [1.0]*2
+        assert models[0].decoder.__tdl__.user_args.graph["units"] is not \
+            models[1].decoder.__tdl__.user_args.graph["units"]
+
+    def test_abuild(self):
+        @tdl.define
+        class Stack(object):
+            @tdl.pr(component=True)
+            def pair(self):
+                return Pair()
+
+            # waits for the decoder, added to the schedule during the build
+            @tdl.pr(reqs=[pair], order=tdl.BUILD)
+            async def total(self):
+                await asyncio.sleep(0)
+                return sum(self.pair.decoder.weights)
+
+        model = Pair()
+        asyncio.run(tdl.abuild(model, encoder={"units": 4},
+                               decoder={"units": 2}))
+        assert model.size == 4 and model.decoder.weights == [1.0]*2
+        model = Stack()
+        asyncio.run(tdl.abuild(model, pair={
+            "encoder": {"units": 3}, "decoder": {"units": 2,
+                                                 "weights": 2.0}}))
+        assert model.total == 4.0
+        assert model.pair.encoder.weights == [1.0]*3
@@ -0,0 +1,212 @@
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import unittest
+import concurrent.futures
+import tdl_attrs as tdl
+
+
+@tdl.define
+class Model(object):
+    units = tdl.pr.required(order=tdl.BUILD)
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD, concurrent=True)
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD, concurrent=True)
+    def bias(self, value=0.0):
+        return [value]*self.units
+
+    @tdl.pr(reqs=[weights, bias], order=tdl.BUILD)
+    def total(self):
+        return sum(self.weights) + sum(self.bias)
+
+
+@tdl.define(slots=True)
+class Config(object):
+    __slots__ = ("name",)
+    activation = tdl.pr.optional("relu")
+    units = tdl.pr.required()
+
+    @tdl.pr(reqs=[units], order=tdl.BUILD)
+    def weights(self, value=1.0):
+        return [value]*self.units
+
+    @tdl.pr(order=tdl.BUILD)
+    def pid(self):
+        return os.getpid()
+
+    def __init__(self, name="config"):
+        self.name = name
+
+
+class ParallelTest(unittest.TestCase):
+    def test_concurrent(self):
+        barrier = threading.Barrier(2, timeout=5)
+        threads = list()
+
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1], concurrent=True)
+            def test_a2(self, value=2.0):
+                threads.append(threading.get_ident())
+                barrier.wait()
+                return value*self.test_a1
+
+            @tdl.pr(reqs=[test_a1], concurrent=True)
+            def test_a3(self, value=3.0):
+                threads.append(threading.get_ident())
+                barrier.wait()
+                return value*self.test_a1
+
+            @tdl.pr(reqs=[test_a2, test_a3])
+            def test_a4(self):
+                return self.test_a2 + self.test_a3
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            with tdl.use_executor(executor):
+                model = ModelA(test_a1=1.0, test_a3=tdl.ar(value=4.0))
+        assert model.test_a4 == 6.0
+        assert len(set(threads)) == 2
+        assert threading.get_ident() not in threads
+
+    def test_threadsafe(self):
+        calls = list()
+
+        @tdl.define(threadsafe=True)
+        class ModelA(object):
+            @tdl.pr(order=tdl.BUILD, concurrent=True)
+            def test_a1(self, value=1.0):
+                calls.append("test_a1")
+                return value
+
+            @tdl.pr(reqs=[test_a1], order=tdl.BUILD)
+            def test_a2(self):
+                calls.append("test_a2")
+                return 2*self.test_a1
+
+        model = ModelA()
+        barrier = threading.Barrier(4, timeout=5)
+
+        def run(executor):
+            barrier.wait()
+            tdl.build(model, executor=executor)
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            threads = [threading.Thread(target=run, args=(executor,))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert calls == ["test_a1", "test_a2"], calls
+        assert model.test_a2 == 2.0
+
+    def test_build(self):
+        serial = Model()
+        tdl.build(serial, units=3, weights=2.0)
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            model = Model()
+            tdl.build(model, executor=executor, units=3, weights=2.0)
+        assert model.weights == serial.weights
+        assert model.bias == serial.bias
+        assert model.total == serial.total == 6.0
+        assert model.__tdl__.state == serial.__tdl__.state
+
+    def test_errors(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+            @tdl.pr(reqs=[test_a1], concurrent=True)
+            def test_a2(self):
+                raise ValueError("test_a2")
+
+            @tdl.pr(reqs=[test_a1], concurrent=True)
+            def test_a3(self):
+                raise KeyError("test_a3")
+
+            @tdl.pr(reqs=[test_a1], concurrent=True)
+            def test_a4(self):
+                return 4.0
+
+            @tdl.pr(reqs=[test_a2])
+            def test_a5(self):
+                return 5.0
+
+        for _ in range(5):
+            with concurrent.futures.ThreadPoolExecutor(3) as executor:
+                with tdl.use_executor(executor):
+                    with self.assertRaises(ValueError):
+                        ModelA(test_a1=1.0)
+
+    def test_process_pool(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            model = Model()
+            tdl.build(model, executor=executor, units=2, bias=1.0)
+        assert model.weights == [1.0, 1.0]
+        assert model.total == 4.0
+
+    def test_targets(self):
+        model = Model()
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            tdl.build(model, executor=executor, targets=["weights"],
+                      units=3)
+        assert model.weights == [1.0]*3
+        assert not tdl.is_initialized(model, "bias")
+
+    def test_pickle(self):
+        for model in (Config("dense", units=2), Model()):
+            copy = pickle.loads(pickle.dumps(model))
+            assert type(copy) is type(model)
+            assert copy.__tdl__.state == model.__tdl__.state
+            assert tdl.get_input_args(copy)[1].keys() == \
+                tdl.get_input_args(model)[1].keys()
+        assert copy.units.__class__ is tdl.TdlDescriptor.Initializer
+        tdl.build(copy, units=2)
+        assert copy.total == 2.0
+        model = pickle.loads(pickle.dumps(Config("dense", units=2)))
+        assert model.name == "dense" and model.activation == "relu"
+        assert not tdl.is_initialized(model, "weights")
+        tdl.build(model)
+        assert model.weights == [1.0, 1.0]
+        # descriptors are pickled as references to their class, the
+        # descriptors created by the factories can also be pickled by value
+        assert pickle.loads(pickle.dumps(Config.units)) is Config.units
+        desc = pickle.loads(pickle.dumps(tdl.pr.optional(3.0)))
+        assert desc.finit(None) == 3.0
+
+    def test_parallel_build(self):
+        models = [Config(f"model{i}", units=i) for i in range(1, 5)]
+        tdl.parallel_build(models, processes=2, weights=2.0)
+        assert [mi.weights for mi in models] == [
+            [2.0]*i for i in range(1, 5)]
+        assert all(mi.pid != os.getpid() for mi in models)
+        assert tdl.get_input_args(models[0])[1]["weights"].args == (2.0,)
+
+        # executors that are not a process pool build copies of the objects
+        models = [Model() for _ in range(3)]
+        args = tdl.ar(3.0)
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            tdl.parallel_build(models, executor=executor, units=2,
+                               weights=args)
+            tdl.parallel_build(models, executor=executor)
+        assert [mi.total for mi in models] == [6.0]*3
+        kargs = tdl.get_input_args(models[0])[1]
+        assert kargs["units"].args == (2,) and kargs["weights"].args == (3.0,)
+        assert kargs["weights"] is not args
+
+    def test_lazy_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, tdl_attrs; "
+             "print('concurrent.futures' in sys.modules); "
+             "print(tdl_attrs.parallel_build.__name__)"],
+            cwd=root, check=True, capture_output=True, text=True).stdout
+        assert output.split() == ["False", "parallel_build"]
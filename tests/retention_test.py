@@ -0,0 +1,120 @@
+import gc
+import unittest
+import tdl_attrs as tdl
+
+
+class Blob(object):
+    """Large value that supports weak references."""
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+@tdl.define(retain="summary")
+class Model(object):
+    @tdl.pr
+    def table(self, value=b""):
+        return len(value)
+
+    @tdl.pr(order=tdl.BUILD)
+    def weights(self, value=None):
+        return value
+
+    @tdl.pr(reqs=[table], order=tdl.LAZY)
+    def total(self, scale=1):
+        return scale*self.table
+
+    def __init__(self, name=None, data=None):
+        self.name = name
+
+
+class RetentionTest(unittest.TestCase):
+    def test_summary(self):
+        table = bytes(4096)
+        model = Model("model", data=bytes(2048), table=table,
+                      weights=bytes(4096), total={"scale": 2})
+        args, kargs = tdl.get_input_args(model)
+        assert args == ("model",)
+        summary = kargs["data"]
+        assert isinstance(summary, tdl.ArgSummary)
+        assert summary.type == "builtins.bytes" and summary.nbytes >= 2048
+        assert len(summary.digest) == 64
+        assert isinstance(kargs["table"].args[0], tdl.ArgSummary)
+        # arguments of attributes that are not initialized are kept
+        assert kargs["weights"].args == (bytes(4096),)
+        assert kargs["total"].kargs == {"scale": 2}
+        assert model.total == 8192
+        tdl.build(model)
+        args, kargs = tdl.get_input_args(model)
+        assert isinstance(kargs["weights"].args[0], tdl.ArgSummary)
+        assert kargs["total"].kargs == {"scale": 2}
+        # the same values have the same summary
+        other = Model("model", data=bytes(2048), table=table)
+        assert tdl.get_input_args(other)[1]["data"] == summary
+
+        with self.assertRaises(ValueError):
+            tdl.rebuild(model, "table")
+        # attributes cleared by a rebuild that raised are computed again
+        tdl.rebuild(model, table=bytes(3))
+        assert model.table == 3 and model.total == 6
+        with self.assertRaises(ValueError):
+            tdl.rebuild(model, "weights")
+        assert not tdl.is_initialized(model, "weights")
+        tdl.rebuild(model, weights=1)
+        assert model.weights == 1
+
+    def test_policies(self):
+        @tdl.define
+        class ModelA(object):
+            @tdl.pr
+            def table(self, value=b""):
+                return len(value)
+
+            @tdl.pr(order=tdl.BUILD)
+            def weights(self, value=None):
+                return value
+
+            def __init__(self, data=None):
+                pass
+
+        blob = Blob(1 << 20)
+        model = ModelA(data=blob, table=bytes(10))
+        tdl.build(model, retain=tdl.Retention("weak", threshold=100),
+                  weights=blob)
+        args, kargs = tdl.get_input_args(model)
+        weak = kargs["data"]
+        assert isinstance(weak, tdl.WeakArg) and weak() is blob
+        # small values are kept
+        assert kargs["table"].args == (bytes(10),)
+        tdl.invalidate(model, "weights")
+        tdl.build(model)
+        assert model.weights is blob
+        tdl.invalidate(model, "weights")
+        del blob, args, kargs
+        gc.collect()
+        assert weak() is None
+        with self.assertRaises(ValueError):
+            tdl.build(model)
+        # arguments given again replace the released ones
+        tdl.build(model, weights=1)
+        assert model.weights == 1
+
+        model = ModelA(table=bytes(10))
+        tdl.build(model, retain="drop", weights=[1, 2])
+        kargs = tdl.get_input_args(model)[1]
+        assert kargs["weights"].args == (
+            tdl.ArgSummary("builtins.list", kargs["weights"].args[0].nbytes,
+                           None),)
+        with self.assertRaises(ValueError):
+            tdl.Retention("none")
+
+    def test_codegen(self):
+        @tdl.define(codegen=True, retain="drop")
+        class ModelA(object):
+            @tdl.pr
+            def test_a1(self, value):
+                return value
+
+        model = ModelA(test_a1=[1, 2])
+        assert model.test_a1 == [1, 2]
+        arg = tdl.get_input_args(model)[1]["test_a1"]
+        assert isinstance(arg.args[0], tdl.ArgSummary)
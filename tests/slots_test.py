@@ -0,0 +1,92 @@
+import unittest
+import tdl_attrs as tdl
+
+
+def make_models(**options):
+    @tdl.define(slots=True, **options)
+    class ModelA(object):
+        __slots__ = ("value",)
+        test_a1 = tdl.pr.required()
+        test_a2 = tdl.pr.optional(2.0)
+
+        @tdl.pr(reqs=[test_a1, test_a2], order=tdl.BUILD)
+        def test_a3(self, value):
+            return value*self.test_a1*self.test_a2
+
+        def __init__(self, value):
+            self.value = value
+
+    @tdl.define(slots=True, **options)
+    class ModelB(ModelA):
+        @tdl.pr(reqs=[ModelA.test_a3], order=tdl.BUILD)
+        def test_b1(self, value=1.0):
+            return value*self.test_a3
+
+        def __init__(self, value):
+            super().__init__(value)
+
+    return ModelA, ModelB
+
+
+class SlotsTest(unittest.TestCase):
+    def test_slots(self):
+        ModelA, ModelB = make_models()
+        model = ModelA("value", test_a1=1.0)
+        assert not hasattr(model, "__dict__")
+        assert model.value == "value"
+        assert model.test_a1 == 1.0 and model.test_a2 == 2.0
+        assert tdl.is_initialized(model, "test_a1")
+        assert not tdl.is_initialized(model, "test_a3")
+        tdl.build(model, test_a3=3.0)
+        assert model.test_a3 == 6.0
+        with self.assertRaises(AttributeError):
+            model.other = 1.0
+        args, kargs = tdl.get_input_args(model)
+        assert args == ("value",) and kargs["test_a3"].args == (3.0,)
+
+    def test_inheritance(self):
+        for codegen in (False, True):
+            ModelA, ModelB = make_models(codegen=codegen)
+            assert "__tdl__test_a1" not in ModelB.__slots__
+            assert "__tdl__test_b1" in ModelB.__slots__
+            model = ModelB("value", test_a1=1.0)
+            tdl.build(model, test_a3=3.0, test_b1=2.0)
+            assert not hasattr(model, "__dict__")
+            assert model.value == "value"
+            assert model.test_b1 == 12.0
+
+    def test_non_slotted_base(self):
+        @tdl.define
+        class ModelA(object):
+            test_a1 = tdl.pr.required()
+
+        @tdl.define(slots=True)
+        class ModelB(ModelA):
+            test_b1 = tdl.pr.optional(1.0)
+
+        model = ModelB(test_a1=2.0)
+        assert model.test_a1 == 2.0 and model.test_b1 == 1.0
+        assert "__tdl__test_a1" not in model.__dict__
+
+    def test_layout(self):
+        ModelA, ModelB = make_models()
+
+        @tdl.define(slots=True)
+        class ModelC(ModelA):
+            test_c1 = tdl.pr.optional(1.0)
+
+        # classes that add slots to a common base can not be combined
+        with self.assertRaises(TypeError):
+            class ModelD(ModelB, ModelC):
+                pass
+
+        with self.assertRaises(tdl.DefinitionError):
+            @tdl.define(slots=True)
+            class Value(int):
+                test_a1 = tdl.pr.optional(1.0)
+
+    def test_weakref(self):
+        import weakref
+        ModelA, _ = make_models()
+        model = ModelA("value", test_a1=1.0)
+        assert weakref.ref(model)() is model
@@ -0,0 +1,127 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import tdl_attrs as tdl
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_model(self, **options):
+        calls = list()
+
+        @tdl.define(**options)
+        class ModelA(object):
+            if options.get("slots"):
+                __slots__ = ("value",)
+            units = tdl.pr.required()
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def table(self, fill=1):
+                calls.append("table")
+                return bytes([fill])*self.units
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def small(self):
+                calls.append("small")
+                return bytearray(b"ab")
+
+            def __init__(self, value):
+                calls.append("__init__")
+                self.value = value
+
+        return ModelA, calls
+
+    def test_snapshot(self):
+        for slots in (False, True):
+            ModelA, calls = self.make_model(slots=slots)
+            model = ModelA("value", units=1000)
+            tdl.build(model, table=2)
+            path = os.path.join(self.tmp.name, f"model_{slots}")
+            tdl.snapshot(model, path, threshold=100)
+            assert os.path.exists(os.path.join(path, "table.bin"))
+            assert not os.path.exists(os.path.join(path, "small.bin"))
+
+            del calls[:]
+            restored = tdl.restore(ModelA, path)
+            assert calls == []
+            assert restored.value == "value"
+            assert restored.units == 1000
+            assert isinstance(restored.table, memoryview)
+            assert restored.table.readonly
+            assert bytes(restored.table) == bytes([2])*1000
+            assert restored.small == bytearray(b"ab")
+            assert tdl.is_initialized(restored, "table")
+            assert tdl.get_input_args(restored)[1]["table"].args == (2,)
+
+            OtherModel, _ = self.make_model(slots=slots)
+            OtherModel.__qualname__ = "OtherModel"
+            with self.assertRaises(ValueError):
+                tdl.restore(OtherModel, path)
+
+    def test_partial(self):
+        ModelA, calls = self.make_model()
+        model = ModelA("value", units=10)
+        path = os.path.join(self.tmp.name, "model")
+        tdl.snapshot(model, path)
+        restored = tdl.restore(ModelA, path)
+        assert not tdl.is_initialized(restored, "table")
+        tdl.build(restored, table=3)
+        assert restored.table == bytes([3])*10
+
+    def test_cache(self):
+        ModelA, calls = self.make_model()
+        cache = tdl.SnapshotCache(self.tmp.name)
+        assert cache.load(ModelA, "value", units=10, table=tdl.ar(4)) is None
+        model = ModelA("value", units=10)
+        tdl.build(model, table=4)
+        cache.save(model)
+        del calls[:]
+        restored = cache.load(ModelA, "value", units=10, table=tdl.ar(4))
+        assert calls == []
+        assert restored.table == model.table
+        assert cache.load(ModelA, "value", units=10, table=5) is None
+        assert cache.load(ModelA, "other", units=10, table=4) is None
+
+        model1 = cache.construct(ModelA, "value", units=20)
+        model2 = cache.construct(ModelA, "value", units=tdl.ar(20))
+        assert model1.units == model2.units == 20
+        assert len(os.listdir(self.tmp.name)) == 2
+
+    def test_cache_retention(self):
+        ModelA, calls = self.make_model(retain="summary")
+        cache = tdl.SnapshotCache(self.tmp.name)
+        for _ in range(3):
+            model = cache.construct(ModelA, list(range(1000)), units=10,
+                                    table=5)
+        # the first object is constructed, the others are restored
+        assert calls == ["__init__"]
+        assert model.value == list(range(1000))
+        assert isinstance(tdl.get_input_args(model)[0][0], tdl.ArgSummary)
+        with self.assertRaises(ValueError):
+            cache.save(model)
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None,
+                     "numpy not installed")
+    def test_numpy(self):
+        import numpy as np
+
+        @tdl.define
+        class ModelA(object):
+            units = tdl.pr.required()
+
+            @tdl.pr(reqs=[units], order=tdl.BUILD)
+            def weights(self):
+                return np.arange(self.units, dtype=np.float64)
+
+        model = ModelA(units=100000)
+        tdl.build(model)
+        path = os.path.join(self.tmp.name, "model")
+        tdl.snapshot(model, path)
+        restored = tdl.restore(ModelA, path)
+        assert isinstance(restored.weights, np.memmap)
+        assert not restored.weights.flags.writeable
+        np.testing.assert_array_equal(restored.weights, model.weights)